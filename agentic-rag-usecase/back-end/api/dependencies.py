@@ -2,27 +2,43 @@
 API Dependencies
 Dependency injection for FastAPI endpoints
 """
-from fastapi import Depends, HTTPException, status
-from typing import Annotated
-from services.agent_service import agent_service, AgentService
-from services.faiss_service import faiss_service, FAISSService
-from db.manager import CustomerManager
-from config.settings import settings
+from fastapi import Depends, HTTPException, Request, status
+from typing import TYPE_CHECKING, Annotated
 from config.logging_config import get_logger
 
+# The service modules pull in LangChain, OpenAI and FAISS; they are
+# imported inside the providers so importing the API stays cheap
+if TYPE_CHECKING:
+    from services.agent_service import AgentService
+    from services.faiss_service import FAISSService
+    from db.manager import CustomerManager
+
 logger = get_logger(__name__)
 
 
-def get_agent_service() -> AgentService:
+def get_agent_service(request: Request) -> "AgentService":
     """
     Get initialized agent service
     
+    Returns the instance stored on app.state during lifespan startup.
+    Falls back to lazy initialization when the lifespan has not run
+    (e.g. a TestClient used outside a context manager).
+    
+    Args:
+        request: FastAPI request
+    
     Returns:
         AgentService instance
         
     Raises:
         HTTPException: If agent service is not initialized
     """
+    service = getattr(request.app.state, "agent_service", None)
+    if service is not None:
+        return service
+    
+    from services.agent_service import agent_service
+    
     if not agent_service.is_ready():
         logger.info("Agent service not initialized, initializing now...")
         success = agent_service.initialize()
@@ -35,16 +51,28 @@ def get_agent_service() -> AgentService:
     return agent_service
 
 
-def get_faiss_service() -> FAISSService:
+def get_faiss_service(request: Request) -> "FAISSService":
     """
     Get initialized FAISS service
     
+    Returns the instance stored on app.state during lifespan startup, so a
+    failed startup initialization is not retried on every request.
+    
+    Args:
+        request: FastAPI request
+    
     Returns:
         FAISSService instance
         
     Raises:
         HTTPException: If FAISS service is not initialized
     """
+    service = getattr(request.app.state, "faiss_service", None)
+    if service is not None:
+        return service
+    
+    from services.faiss_service import faiss_service
+    
     if not faiss_service.is_ready():
         logger.info("FAISS service not initialized, initializing now...")
         success = faiss_service.initialize()
@@ -54,19 +82,22 @@ def get_faiss_service() -> FAISSService:
     return faiss_service
 
 
-def get_customer_manager() -> CustomerManager:
+def get_customer_manager() -> "CustomerManager":
     """
     Get CustomerManager instance for CRM database
     
+    Reuses the lazily-created manager shared with the CRM tools, so the
+    SQLAlchemy engine and its connection pool are built once per process.
+    
     Returns:
         CustomerManager instance
     """
-    db_path = settings.crm_database_full_path
-    db_uri = f"sqlite:///{db_path}"
-    return CustomerManager(db_uri)
+    from tools.crm_tools import get_customer_manager as get_shared_customer_manager
+    
+    return get_shared_customer_manager()
 
 
 # Type aliases for dependency injection
-AgentServiceDep = Annotated[AgentService, Depends(get_agent_service)]
-FAISSServiceDep = Annotated[FAISSService, Depends(get_faiss_service)]
-CustomerManagerDep = Annotated[CustomerManager, Depends(get_customer_manager)]
+AgentServiceDep = Annotated["AgentService", Depends(get_agent_service)]
+FAISSServiceDep = Annotated["FAISSService", Depends(get_faiss_service)]
+CustomerManagerDep = Annotated["CustomerManager", Depends(get_customer_manager)]
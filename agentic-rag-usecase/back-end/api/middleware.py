@@ -2,17 +2,40 @@
 Error Handling Middleware
 Custom exception handlers and middleware for better error responses
 """
-from fastapi import Request, status
-from fastapi.responses import JSONResponse
+from fastapi import Request, Response, status
 from fastapi.exceptions import RequestValidationError
 from starlette.exceptions import HTTPException as StarletteHTTPException
+import logging
 import time
+import orjson
 from config.logging_config import get_logger
 
 logger = get_logger(__name__)
 
+# Response log function indexed by status class (status_code // 100):
+# 1xx-3xx -> info, 4xx -> warning, 5xx -> error
+_LOG_BY_STATUS_CLASS = (
+    logger.info, logger.info, logger.info, logger.info,
+    logger.warning, logger.error
+)
 
-async def http_exception_handler(request: Request, exc: StarletteHTTPException) -> JSONResponse:
+# Error body templates; only the variable fields are serialized per response
+_HTTP_ERROR_TEMPLATE = b'{"error":%s,"detail":%s,"status_code":%d,"path":%s}'
+_VALIDATION_ERROR_TEMPLATE = (
+    b'{"error":"ValidationError","detail":"Request validation failed",'
+    b'"status_code":422,"validation_errors":%s}'
+)
+_GENERAL_ERROR_TEMPLATE = (
+    b'{"error":%s,"detail":"Internal server error occurred","status_code":500,"path":%s}'
+)
+
+
+def _json_response(content: bytes, status_code: int) -> Response:
+    """Wrap a pre-serialized JSON error body in a response"""
+    return Response(content=content, status_code=status_code, media_type="application/json")
+
+
+async def http_exception_handler(request: Request, exc: StarletteHTTPException) -> Response:
     """
     Handle HTTP exceptions with standardized format
     
@@ -24,21 +47,21 @@ async def http_exception_handler(request: Request, exc: StarletteHTTPException)
         JSON response with error details
     """
     logger.warning(
-        f"HTTP {exc.status_code} - {request.method} {request.url.path} - {exc.detail}"
+        "HTTP %s - %s %s - %s", exc.status_code, request.method, request.url.path, exc.detail
     )
     
-    return JSONResponse(
-        status_code=exc.status_code,
-        content={
-            "error": exc.__class__.__name__,
-            "detail": exc.detail,
-            "status_code": exc.status_code,
-            "path": str(request.url.path)
-        }
+    return _json_response(
+        _HTTP_ERROR_TEMPLATE % (
+            orjson.dumps(exc.__class__.__name__),
+            orjson.dumps(exc.detail, default=str),
+            exc.status_code,
+            orjson.dumps(request.url.path)
+        ),
+        exc.status_code
     )
 
 
-async def validation_exception_handler(request: Request, exc: RequestValidationError) -> JSONResponse:
+async def validation_exception_handler(request: Request, exc: RequestValidationError) -> Response:
     """
     Handle request validation errors with detailed information
     
@@ -51,7 +74,7 @@ async def validation_exception_handler(request: Request, exc: RequestValidationE
     """
     errors = exc.errors()
     logger.warning(
-        f"Validation Error - {request.method} {request.url.path} - {len(errors)} error(s)"
+        "Validation Error - %s %s - %d error(s)", request.method, request.url.path, len(errors)
     )
     
     # Format validation errors
@@ -63,18 +86,13 @@ async def validation_exception_handler(request: Request, exc: RequestValidationE
             "type": error["type"]
         })
     
-    return JSONResponse(
-        status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
-        content={
-            "error": "ValidationError",
-            "detail": "Request validation failed",
-            "status_code": 422,
-            "validation_errors": formatted_errors
-        }
+    return _json_response(
+        _VALIDATION_ERROR_TEMPLATE % orjson.dumps(formatted_errors, default=str),
+        status.HTTP_422_UNPROCESSABLE_ENTITY
     )
 
 
-async def general_exception_handler(request: Request, exc: Exception) -> JSONResponse:
+async def general_exception_handler(request: Request, exc: Exception) -> Response:
     """
     Handle general exceptions with logging
     
@@ -86,24 +104,26 @@ async def general_exception_handler(request: Request, exc: Exception) -> JSONRes
         JSON response with error details
     """
     logger.error(
-        f"Unhandled Exception - {request.method} {request.url.path} - {str(exc)}",
+        "Unhandled Exception - %s %s - %s", request.method, request.url.path, exc,
         exc_info=True
     )
     
-    return JSONResponse(
-        status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-        content={
-            "error": exc.__class__.__name__,
-            "detail": "Internal server error occurred",
-            "status_code": 500,
-            "path": str(request.url.path)
-        }
+    return _json_response(
+        _GENERAL_ERROR_TEMPLATE % (
+            orjson.dumps(exc.__class__.__name__),
+            orjson.dumps(request.url.path)
+        ),
+        status.HTTP_500_INTERNAL_SERVER_ERROR
     )
 
 
 class RequestLoggingMiddleware:
     """
     Middleware to log all requests and responses
+    
+    Implemented as a raw ASGI app rather than a BaseHTTPMiddleware, so it
+    adds no extra task group and never builds a Request object. Register it
+    with app.add_middleware(), not @app.middleware("http").
     """
     
     def __init__(self, app):
@@ -114,16 +134,16 @@ class RequestLoggingMiddleware:
             await self.app(scope, receive, send)
             return
         
-        start_time = time.time()
+        start_time = time.perf_counter_ns()
         
         # Extract request info
         method = scope["method"]
         path = scope["path"]
-        client = scope.get("client", ["unknown", 0])
-        client_ip = client[0] if client else "unknown"
         
-        # Log request
-        logger.info(f"→ {method} {path} from {client_ip}")
+        # Log request (client lookup skipped when INFO is filtered out)
+        if logger.isEnabledFor(logging.INFO):
+            client = scope.get("client")
+            logger.info("→ %s %s from %s", method, path, client[0] if client else "unknown")
         
         # Track response
         status_code = 500
@@ -138,8 +158,6 @@ class RequestLoggingMiddleware:
             await self.app(scope, receive, send_wrapper)
         finally:
             # Log response
-            duration_ms = int((time.time() - start_time) * 1000)
-            log_level = "info" if status_code < 400 else "warning" if status_code < 500 else "error"
-            getattr(logger, log_level)(
-                f"← {method} {path} - {status_code} ({duration_ms}ms)"
-            )
+            duration_ms = (time.perf_counter_ns() - start_time) // 1_000_000
+            log = _LOG_BY_STATUS_CLASS[min(status_code // 100, 5)]
+            log("← %s %s - %d (%dms)", method, path, status_code, duration_ms)
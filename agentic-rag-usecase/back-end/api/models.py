@@ -5,6 +5,7 @@ Pydantic schemas for request/response validation
 from pydantic import BaseModel, Field
 from typing import List, Optional, Dict, Any
 from enum import Enum
+from operator import attrgetter
 
 
 class MessageRole(str, Enum):
@@ -28,6 +29,10 @@ class ConversationMessage(BaseModel):
         }
 
 
+# Fetches (role, content) from a ConversationMessage in a single C-level call
+_role_and_content = attrgetter("role", "content")
+
+
 class ChatRequest(BaseModel):
     """Request model for chat endpoint"""
     message: str = Field(..., min_length=1, max_length=10000, description="User message/question")
@@ -35,6 +40,17 @@ class ChatRequest(BaseModel):
         default=None,
         description="Previous conversation messages for context"
     )
+    thread_id: Optional[str] = Field(
+        default=None,
+        min_length=1,
+        max_length=128,
+        description=(
+            "Optional server-side conversation id. Pass the thread_id from a "
+            "previous response to continue that thread; any other value starts "
+            "a new thread under a server-issued id. Once a thread exists the "
+            "server keeps its history, and conversation_history is ignored"
+        )
+    )
     
     class Config:
         json_schema_extra = {
@@ -52,6 +68,20 @@ class ChatRequest(BaseModel):
                 ]
             }
         }
+    
+    def history_as_dicts(self) -> Optional[List[Dict[str, str]]]:
+        """
+        Convert conversation history to the dict format used by AgentService
+        
+        Returns:
+            List of {"role": ..., "content": ...} dicts, or None if no history
+        """
+        if not self.conversation_history:
+            return None
+        return [
+            {"role": role.value, "content": content}
+            for role, content in map(_role_and_content, self.conversation_history)
+        ]
 
 
 class AgentStep(BaseModel):
@@ -71,6 +101,10 @@ class ChatResponse(BaseModel):
         default=None,
         description="Optional metadata about the response"
     )
+    thread_id: Optional[str] = Field(
+        default=None,
+        description="Server-issued conversation id, when the request used a thread"
+    )
     
     class Config:
         json_schema_extra = {
@@ -2,14 +2,18 @@
 API Routes
 FastAPI endpoint handlers for /chat, /chat-stream, /health, /tools
 """
+import asyncio
 import time
 import json
-from datetime import datetime
-from fastapi import APIRouter, HTTPException, status
+import orjson
+from functools import lru_cache
+from datetime import datetime, timezone
+from fastapi import APIRouter, HTTPException, Response, status
 from fastapi.responses import StreamingResponse
-from typing import AsyncIterator
+from typing import TYPE_CHECKING, Any, AsyncIterator, Dict, Tuple
+from langchain_core.messages import HumanMessage, AIMessage
 from api.models import (
-    ChatRequest, ChatResponse, StreamEvent, StreamEventType,
+    ChatRequest, ChatResponse, StreamEventType,
     HealthResponse, HealthStatus, ComponentHealth,
     ToolsResponse, ToolInfo, ConversationMessage, MessageRole,
     ErrorResponse
@@ -18,11 +22,115 @@ from api.dependencies import AgentServiceDep, FAISSServiceDep, CustomerManagerDe
 from config.logging_config import get_logger
 from config.settings import settings
 
+if TYPE_CHECKING:
+    from services.agent_service import AgentService
+    from services.faiss_service import FAISSService
+    from db.manager import CustomerManager
+
 logger = get_logger(__name__)
 
 # Create router
 router = APIRouter()
 
+# Maps LangChain message classes to API roles; other message types
+# (system, tool) are not part of the returned conversation history
+_ROLE_BY_MESSAGE_TYPE = {
+    HumanMessage: MessageRole.USER,
+    AIMessage: MessageRole.ASSISTANT,
+}
+
+# Max agent chunks buffered ahead of a slow streaming client
+_STREAM_QUEUE_SIZE = 16
+
+# Marks the end of the agent stream in the producer/consumer queue
+_STREAM_DONE = object()
+
+# Last formatted health-check timestamp as (epoch_second, iso_string)
+_timestamp_cache: Tuple[int, str] = (0, "")
+
+
+def _json_default(obj: Any) -> Any:
+    """Serialize objects orjson does not handle natively (e.g. LangChain messages)"""
+    if hasattr(obj, "model_dump"):
+        return obj.model_dump()
+    return str(obj)
+
+
+# SSE frame prefix per event type, so only the event data is serialized per frame
+_SSE_PREFIXES = {
+    event_type: b'data: {"event":"' + event_type.value.encode() + b'","data":'
+    for event_type in StreamEventType
+}
+
+
+def _sse(event_type: StreamEventType, data: Dict[str, Any]) -> bytes:
+    """
+    Encode a single Server-Sent Event frame
+    
+    Serializes with orjson instead of building a StreamEvent, which is kept
+    only to document the event schema.
+    
+    Args:
+        event_type: Type of streaming event
+        data: Event data
+        
+    Returns:
+        SSE frame as bytes
+    """
+    return _SSE_PREFIXES[event_type] + orjson.dumps(data, default=_json_default) + b"}\n\n"
+
+
+# Response headers shared by every /chat-stream response
+_SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "Connection": "keep-alive",
+    "X-Accel-Buffering": "no"  # Disable nginx buffering
+}
+
+# START/END frames are identical for every stream
+_SSE_START_FRAME = _sse(StreamEventType.START, {"message": "Streaming started"})
+_SSE_END_FRAME = _sse(StreamEventType.END, {"message": "Streaming complete"})
+
+
+def _utc_timestamp() -> str:
+    """
+    Get the current UTC time as an ISO 8601 string
+    
+    The formatted string is reused for calls within the same second, which
+    is all the resolution health checks need.
+    
+    Returns:
+        ISO 8601 timestamp with second precision
+    """
+    global _timestamp_cache
+    
+    now = int(time.time())
+    if now != _timestamp_cache[0]:
+        _timestamp_cache = (now, datetime.fromtimestamp(now, tz=timezone.utc).isoformat())
+    return _timestamp_cache[1]
+
+
+@lru_cache(maxsize=1)
+def _tools_response_body(agent: "AgentService", tools_count: int) -> bytes:
+    """
+    Build the serialized /tools payload
+    
+    The tool list is static once the agent is initialized, so the response
+    is validated and serialized once per (agent, tools_count) pair.
+    
+    Args:
+        agent: Agent service instance
+        tools_count: Number of tools loaded (invalidates the cache if it changes)
+        
+    Returns:
+        JSON-encoded ToolsResponse
+    """
+    tools = [
+        ToolInfo(name=tool["name"], description=tool["description"])
+        for tool in agent.get_tools_info()
+    ]
+    return ToolsResponse(tools=tools, total=len(tools)).model_dump_json().encode()
+
 
 @router.post(
     "/chat",
@@ -61,21 +169,19 @@ async def chat(
         ChatResponse with assistant's message and updated conversation history
     """
     try:
-        start_time = time.time()
-        logger.info(f"Chat request received: {request.message[:100]}...")
+        start_time = time.perf_counter_ns()
+        logger.info("Chat request received: %.100s...", request.message)
         
         # Convert conversation history to dict format
-        history = None
-        if request.conversation_history:
-            history = [
-                {"role": msg.role.value, "content": msg.content}
-                for msg in request.conversation_history
-            ]
+        history = request.history_as_dicts()
+        thread_id = agent.open_thread(request.thread_id) if request.thread_id else None
         
-        # Invoke agent
-        result = agent.invoke(
+        # Invoke agent on the event loop; LLM and tool I/O is awaited
+        # rather than holding a worker thread for the whole agent run
+        result = await agent.ainvoke(
             message=request.message,
-            conversation_history=history
+            conversation_history=history,
+            thread_id=thread_id
         )
         
         # Extract response from agent result
@@ -87,35 +193,35 @@ async def chat(
         assistant_message = ""
         
         for msg in messages:
-            msg_type = msg.__class__.__name__
-            content = msg.content if hasattr(msg, 'content') else str(msg)
+            role = _ROLE_BY_MESSAGE_TYPE.get(type(msg))
+            if role is None:
+                continue
             
-            if msg_type == "HumanMessage":
-                conversation_history.append(
-                    ConversationMessage(role=MessageRole.USER, content=content)
-                )
-            elif msg_type == "AIMessage":
-                conversation_history.append(
-                    ConversationMessage(role=MessageRole.ASSISTANT, content=content)
-                )
+            content = msg.content
+            conversation_history.append(
+                ConversationMessage.model_construct(role=role, content=content)
+            )
+            if role is MessageRole.ASSISTANT:
                 assistant_message = content  # Last AI message is the response
         
         # Calculate response time
-        response_time_ms = int((time.time() - start_time) * 1000)
+        response_time_ms = (time.perf_counter_ns() - start_time) // 1_000_000
         
-        logger.info(f"Chat response generated in {response_time_ms}ms")
+        logger.info("Chat response generated in %dms", response_time_ms)
         
-        return ChatResponse(
+        # Agent output is trusted, so skip re-validating it on construction
+        return ChatResponse.model_construct(
             message=assistant_message,
             conversation_history=conversation_history,
             metadata={
                 "response_time_ms": response_time_ms,
                 "tools_available": len(agent.tools)
-            }
+            },
+            thread_id=thread_id
         )
         
     except Exception as e:
-        logger.error(f"Error in chat endpoint: {str(e)}", exc_info=True)
+        logger.error("Error in chat endpoint: %s", e, exc_info=True)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error processing chat request: {str(e)}"
@@ -158,183 +264,244 @@ async def chat_stream(
     Returns:
         StreamingResponse with Server-Sent Events
     """
-    logger.info(f"Chat stream request received: {request.message[:100]}...")
+    logger.info("Chat stream request received: %.100s...", request.message)
     
-    async def event_generator() -> AsyncIterator[str]:
+    async def event_generator() -> AsyncIterator[bytes]:
         """Generate Server-Sent Events"""
         try:
-            # Send start event
-            start_event = StreamEvent(
-                event=StreamEventType.START,
-                data={"message": "Streaming started"}
-            )
-            yield f"data: {start_event.model_dump_json()}\n\n"
+            # Send start event, carrying the server-issued thread id if any
+            thread_id = agent.open_thread(request.thread_id) if request.thread_id else None
+            if thread_id is None:
+                yield _SSE_START_FRAME
+            else:
+                yield _sse(
+                    StreamEventType.START,
+                    {"message": "Streaming started", "thread_id": thread_id}
+                )
             
             # Convert conversation history to dict format
-            history = None
-            if request.conversation_history:
-                history = [
-                    {"role": msg.role.value, "content": msg.content}
-                    for msg in request.conversation_history
-                ]
+            history = request.history_as_dicts()
+            
+            # Run the agent in a background task feeding a bounded queue,
+            # so agent reasoning is not paced by how fast the client reads
+            queue: asyncio.Queue = asyncio.Queue(maxsize=_STREAM_QUEUE_SIZE)
             
-            # Stream agent responses
-            async for chunk in agent.stream(
-                message=request.message,
-                conversation_history=history
-            ):
-                # Determine event type based on chunk keys
-                if "agent" in chunk:
-                    event_type = StreamEventType.AGENT
-                elif "tools" in chunk:
-                    event_type = StreamEventType.TOOL
+            async def produce() -> None:
+                try:
+                    async for chunk in agent.stream(
+                        message=request.message,
+                        conversation_history=history,
+                        thread_id=thread_id
+                    ):
+                        await queue.put(chunk)
+                except Exception as e:
+                    await queue.put(e)
                 else:
-                    event_type = StreamEventType.AGENT
-                
-                # Create stream event
-                stream_event = StreamEvent(
-                    event=event_type,
-                    data=chunk
-                )
-                
-                yield f"data: {stream_event.model_dump_json()}\n\n"
+                    await queue.put(_STREAM_DONE)
+            
+            producer = asyncio.create_task(produce())
+            try:
+                # Stream agent responses; chunks that are already queued
+                # when the client catches up go out as one write, without
+                # holding back a chunk that is ready on its own
+                done = False
+                while not done:
+                    items = [await queue.get()]
+                    while not queue.empty():
+                        items.append(queue.get_nowait())
+                    
+                    frames = []
+                    for chunk in items:
+                        if chunk is _STREAM_DONE:
+                            done = True
+                            break
+                        if isinstance(chunk, Exception):
+                            if frames:
+                                yield b"".join(frames)
+                            raise chunk
+                        
+                        # Determine event type based on chunk keys
+                        if "agent" in chunk:
+                            event_type = StreamEventType.AGENT
+                        elif "tools" in chunk:
+                            event_type = StreamEventType.TOOL
+                        else:
+                            event_type = StreamEventType.AGENT
+                        
+                        frames.append(_sse(event_type, chunk))
+                    
+                    if frames:
+                        yield b"".join(frames)
+            finally:
+                # Stop the agent if the client disconnected mid-stream
+                producer.cancel()
             
             # Send end event
-            end_event = StreamEvent(
-                event=StreamEventType.END,
-                data={"message": "Streaming complete"}
-            )
-            yield f"data: {end_event.model_dump_json()}\n\n"
+            yield _SSE_END_FRAME
             
+        except asyncio.CancelledError:
+            # Client disconnected; expected, so skip traceback formatting
+            logger.info("Chat stream cancelled: client disconnected")
+            raise
         except Exception as e:
-            logger.error(f"Error in chat stream: {str(e)}", exc_info=True)
-            error_event = StreamEvent(
-                event=StreamEventType.ERROR,
-                data={"error": str(e)}
-            )
-            yield f"data: {error_event.model_dump_json()}\n\n"
+            logger.error("Error in chat stream: %s", e, exc_info=True)
+            yield _sse(StreamEventType.ERROR, {"error": str(e)})
     
     return StreamingResponse(
         event_generator(),
         media_type="text/event-stream",
-        headers={
-            "Cache-Control": "no-cache",
-            "Connection": "keep-alive",
-            "X-Accel-Buffering": "no"  # Disable nginx buffering
-        }
+        headers=_SSE_HEADERS
     )
 
 
-@router.get(
-    "/health",
-    response_model=HealthResponse,
-    summary="Health Check",
-    description="""
-    Check the health status of the API and its components.
-    
-    Returns health information for:
-    - Agent service
-    - FAISS vector store
-    - Database connections
-    - Overall system status
-    """,
-    responses={
-        200: {"model": HealthResponse, "description": "Health status"}
-    }
-)
-async def health(
-    agent: AgentServiceDep,
-    faiss: FAISSServiceDep,
-    customer_db: CustomerManagerDep
-) -> HealthResponse:
+# Severity order used to combine component results into the overall status
+_HEALTH_SEVERITY = {
+    HealthStatus.HEALTHY: 0,
+    HealthStatus.DEGRADED: 1,
+    HealthStatus.UNHEALTHY: 2,
+}
+
+
+def _check_agent(agent: "AgentService") -> Tuple[ComponentHealth, HealthStatus]:
     """
-    Perform health check on all components
+    Probe the agent service
     
-    Args:
-        agent: Agent service dependency
-        faiss: FAISS service dependency
-        customer_db: Customer database dependency
-        
     Returns:
-        HealthResponse with component statuses
+        Component health and its impact on the overall status
     """
-    components = {}
-    overall_status = HealthStatus.HEALTHY
-    
-    # Check agent service
     try:
-        agent_ready = agent.is_ready()
-        if agent_ready:
+        if agent.is_ready():
             agent_info = agent.get_info()
-            components["agent"] = ComponentHealth(
+            return ComponentHealth(
                 status=HealthStatus.HEALTHY,
                 message="Agent service operational",
                 details={
                     "model": agent_info.get("model"),
                     "tools_count": agent_info.get("tools_count")
                 }
-            )
-        else:
-            components["agent"] = ComponentHealth(
-                status=HealthStatus.UNHEALTHY,
-                message="Agent service not initialized"
-            )
-            overall_status = HealthStatus.DEGRADED
+            ), HealthStatus.HEALTHY
+        return ComponentHealth(
+            status=HealthStatus.UNHEALTHY,
+            message="Agent service not initialized"
+        ), HealthStatus.DEGRADED
     except Exception as e:
-        components["agent"] = ComponentHealth(
+        return ComponentHealth(
             status=HealthStatus.UNHEALTHY,
             message=f"Agent service error: {str(e)}"
-        )
-        overall_status = HealthStatus.UNHEALTHY
+        ), HealthStatus.UNHEALTHY
+
+
+def _check_faiss(faiss: "FAISSService") -> Tuple[ComponentHealth, HealthStatus]:
+    """
+    Probe the FAISS service (optional, never affects the overall status)
     
-    # Check FAISS service
+    Returns:
+        Component health and its impact on the overall status
+    """
     try:
-        faiss_ready = faiss.is_ready()
-        if faiss_ready:
+        if faiss.is_ready():
             faiss_info = faiss.get_info()
-            components["faiss"] = ComponentHealth(
+            return ComponentHealth(
                 status=HealthStatus.HEALTHY,
                 message="FAISS service operational",
                 details={
                     "tool_name": faiss_info.get("tool_name"),
                     "cache_enabled": faiss_info.get("cache_enabled")
                 }
-            )
-        else:
-            components["faiss"] = ComponentHealth(
-                status=HealthStatus.DEGRADED,
-                message="FAISS service not initialized (optional)"
-            )
-            # FAISS is optional, so don't mark as unhealthy
+            ), HealthStatus.HEALTHY
+        return ComponentHealth(
+            status=HealthStatus.DEGRADED,
+            message="FAISS service not initialized (optional)"
+        ), HealthStatus.HEALTHY
     except Exception as e:
-        components["faiss"] = ComponentHealth(
+        return ComponentHealth(
             status=HealthStatus.DEGRADED,
             message=f"FAISS service warning: {str(e)}"
-        )
+        ), HealthStatus.HEALTHY
+
+
+def _check_database(customer_db: "CustomerManager") -> Tuple[ComponentHealth, HealthStatus]:
+    """
+    Probe the CRM database
     
-    # Check database
+    Returns:
+        Component health and its impact on the overall status
+    """
     try:
         customer_count = customer_db.get_customer_count()
-        components["database"] = ComponentHealth(
+        return ComponentHealth(
             status=HealthStatus.HEALTHY,
             message="Database accessible",
             details={
                 "crm_customers": customer_count,
                 "database_path": str(settings.crm_database_full_path)
             }
-        )
+        ), HealthStatus.HEALTHY
     except Exception as e:
-        components["database"] = ComponentHealth(
+        return ComponentHealth(
             status=HealthStatus.UNHEALTHY,
             message=f"Database error: {str(e)}"
+        ), HealthStatus.UNHEALTHY
+
+
+@router.get(
+    "/health",
+    response_model=HealthResponse,
+    summary="Health Check",
+    description="""
+    Check the health status of the API and its components.
+    
+    Returns health information for:
+    - Agent service
+    - FAISS vector store
+    - Database connections
+    - Overall system status
+    """,
+    responses={
+        200: {"model": HealthResponse, "description": "Health status"}
+    }
+)
+async def health(
+    agent: AgentServiceDep,
+    faiss: FAISSServiceDep,
+    customer_db: CustomerManagerDep
+) -> HealthResponse:
+    """
+    Perform health check on all components
+    
+    Args:
+        agent: Agent service dependency
+        faiss: FAISS service dependency
+        customer_db: Customer database dependency
+        
+    Returns:
+        HealthResponse with component statuses
+    """
+    # Probe components concurrently; the database probe hits SQLite, so
+    # each probe runs in a worker thread to keep the event loop free
+    (agent_health, agent_impact), (faiss_health, faiss_impact), (db_health, db_impact) = (
+        await asyncio.gather(
+            asyncio.to_thread(_check_agent, agent),
+            asyncio.to_thread(_check_faiss, faiss),
+            asyncio.to_thread(_check_database, customer_db)
         )
-        overall_status = HealthStatus.UNHEALTHY
+    )
+    
+    components = {
+        "agent": agent_health,
+        "faiss": faiss_health,
+        "database": db_health
+    }
+    overall_status = max(
+        (agent_impact, faiss_impact, db_impact),
+        key=_HEALTH_SEVERITY.__getitem__
+    )
     
     return HealthResponse(
         status=overall_status,
         components=components,
         version="1.0.0",
-        timestamp=datetime.utcnow().isoformat()
+        timestamp=_utc_timestamp()
     )
 
 
@@ -355,7 +522,7 @@ async def health(
         200: {"model": ToolsResponse, "description": "List of tools"}
     }
 )
-async def list_tools(agent: AgentServiceDep) -> ToolsResponse:
+async def list_tools(agent: AgentServiceDep) -> Response:
     """
     List all available tools
     
@@ -363,23 +530,16 @@ async def list_tools(agent: AgentServiceDep) -> ToolsResponse:
         agent: Agent service dependency
         
     Returns:
-        ToolsResponse with tool information
+        Pre-serialized ToolsResponse with tool information
     """
     try:
-        tools_info = agent.get_tools_info()
-        
-        tools = [
-            ToolInfo(name=tool["name"], description=tool["description"])
-            for tool in tools_info
-        ]
-        
-        return ToolsResponse(
-            tools=tools,
-            total=len(tools)
+        return Response(
+            content=_tools_response_body(agent, len(agent.tools)),
+            media_type="application/json"
         )
         
     except Exception as e:
-        logger.error(f"Error listing tools: {str(e)}", exc_info=True)
+        logger.error("Error listing tools: %s", e, exc_info=True)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error retrieving tools: {str(e)}"
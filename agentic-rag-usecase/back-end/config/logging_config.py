@@ -4,12 +4,60 @@ Logging configuration for the Agentic RAG API.
 Supports both text and JSON formatted logging based on configuration.
 """
 
+import atexit
 import logging
 import sys
+import time
+from logging.handlers import QueueHandler, QueueListener
+from queue import SimpleQueue
+from functools import lru_cache
+from json.encoder import encode_basestring
 from pathlib import Path
-from typing import Optional
-import json
-from datetime import datetime
+from typing import Any, Callable, Dict, Optional, Tuple
+import orjson
+
+
+# Attributes every LogRecord carries; anything else on a record came from
+# the caller's extra={...} and is emitted as a structured field
+_STD_LOGRECORD_ATTRS = frozenset(
+    vars(logging.LogRecord("", 0, "", 0, "", None, None))
+) | {"message", "asctime"}
+
+
+# Background listener that owns the file handler, if file logging is on
+_file_listener: Optional[QueueListener] = None
+
+
+class LazyDict:
+    """
+    Deferred structured-log context.
+    
+    Wrap expensive context in this when passing it as a logging extra, e.g.
+    logger.info("Request", extra={"context": LazyDict(lambda: {...})}).
+    The factory only runs if a JSONFormatter actually serializes the record,
+    so nothing is built when the level filters the record out.
+    """
+    
+    __slots__ = ("_factory",)
+    
+    def __init__(self, factory: Callable[[], Dict[str, Any]]):
+        self._factory = factory
+    
+    def __json__(self) -> Dict[str, Any]:
+        """Build the context; called by JSONFormatter during serialization"""
+        return self._factory()
+    
+    def __repr__(self) -> str:
+        """Render the built context, e.g. when a text formatter uses it"""
+        return repr(self._factory())
+
+
+def _json_default(obj: Any) -> Any:
+    """Serialize values orjson does not handle natively (LazyDict, else str)"""
+    to_json = getattr(obj, "__json__", None)
+    if to_json is not None:
+        return to_json()
+    return str(obj)
 
 
 class JSONFormatter(logging.Formatter):
@@ -18,6 +66,39 @@ class JSONFormatter(logging.Formatter):
     Outputs log records as JSON objects.
     """
     
+    # Bound once to skip the module attribute lookup per record
+    _dumps = orjson.dumps
+    
+    # Layout of records without exception info or extras, filled in
+    # directly instead of building and serializing a dict; timestamp and
+    # level never need escaping, logger name and message are JSON string
+    # literals from the C encoder (same escaping as orjson)
+    _TEMPLATE = '{"timestamp":"%s","level":"%s","logger":%s,"message":%s}'
+    
+    # Last formatted second as (epoch_second, "YYYY-MM-DDTHH:MM:SS");
+    # a single tuple so concurrent handlers never see a torn update
+    _second_cache: Tuple[int, str] = (-1, "")
+    
+    def _timestamp(self, record: logging.LogRecord) -> str:
+        """
+        Format the record creation time as ISO 8601 UTC with milliseconds.
+        
+        Uses record.created instead of reading the clock again, and only
+        re-runs strftime when the second changes.
+        
+        Args:
+            record: Log record to timestamp
+            
+        Returns:
+            Timestamp string, e.g. 2024-01-01T12:00:00.123Z
+        """
+        sec = int(record.created)
+        cached_sec, prefix = JSONFormatter._second_cache
+        if sec != cached_sec:
+            prefix = time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(sec))
+            JSONFormatter._second_cache = (sec, prefix)
+        return "%s.%03dZ" % (prefix, record.msecs)
+    
     def format(self, record: logging.LogRecord) -> str:
         """
         Format log record as JSON.
@@ -28,22 +109,41 @@ class JSONFormatter(logging.Formatter):
         Returns:
             JSON string representation of log record
         """
+        # Fast path: the common plain record fits the fixed template
+        if not record.exc_info and _STD_LOGRECORD_ATTRS.issuperset(record.__dict__):
+            return self._TEMPLATE % (
+                self._timestamp(record),
+                record.levelname,
+                encode_basestring(record.name),
+                encode_basestring(record.getMessage()),
+            )
+        
         log_obj = {
-            "timestamp": datetime.utcnow().isoformat() + "Z",
+            "timestamp": self._timestamp(record),
             "level": record.levelname,
             "logger": record.name,
             "message": record.getMessage(),
         }
         
         # Add exception info if present
+        # Format the traceback once and cache it on the record, the same way
+        # logging.Formatter does, so every handler reuses the text
         if record.exc_info:
-            log_obj["exception"] = self.formatException(record.exc_info)
+            if not record.exc_text:
+                record.exc_text = self.formatException(record.exc_info)
+            log_obj["exception"] = record.exc_text
         
         # Add extra fields if present
-        if hasattr(record, "context"):
-            log_obj["context"] = record.context
+        extras = {
+            key: value
+            for key, value in record.__dict__.items()
+            if key not in _STD_LOGRECORD_ATTRS
+        }
+        if extras:
+            log_obj.update(extras)
         
-        return json.dumps(log_obj)
+        # Handlers expect str, so decode the bytes orjson returns
+        return self._dumps(log_obj, default=_json_default).decode()
 
 
 def setup_logging(
@@ -55,13 +155,21 @@ def setup_logging(
     """
     Configure logging for the application.
     
+    File output goes through a QueueHandler so request threads only
+    enqueue records; a QueueListener thread does the disk writes. The
+    listener runs until the next setup_logging() call or process exit,
+    when shutdown_logging() drains the queue.
+    
     Args:
         log_level: Logging level (DEBUG, INFO, WARNING, ERROR, CRITICAL)
         log_format: Format type ('text' or 'json')
         log_file_enabled: Whether to enable file logging
         log_file_path: Path to log file (if file logging is enabled)
     """
+    global _file_listener
+    
     # Clear existing handlers
+    shutdown_logging()
     root_logger = logging.getLogger()
     root_logger.handlers.clear()
     
@@ -91,10 +199,18 @@ def setup_logging(
         log_path = Path(log_file_path)
         log_path.parent.mkdir(parents=True, exist_ok=True)
         
+        # Records are fully formatted by the QueueHandler before they are
+        # enqueued, so the file handler only writes the finished line
+        log_queue = SimpleQueue()
+        queue_handler = QueueHandler(log_queue)
+        queue_handler.setLevel(level)
+        queue_handler.setFormatter(formatter)
+        root_logger.addHandler(queue_handler)
+        
         file_handler = logging.FileHandler(log_path)
-        file_handler.setLevel(level)
-        file_handler.setFormatter(formatter)
-        root_logger.addHandler(file_handler)
+        file_handler.setFormatter(logging.Formatter("%(message)s"))
+        _file_listener = QueueListener(log_queue, file_handler)
+        _file_listener.start()
     
     # Reduce noise from third-party libraries
     logging.getLogger("httpx").setLevel(logging.WARNING)
@@ -104,10 +220,38 @@ def setup_logging(
     logging.getLogger("faiss").setLevel(logging.WARNING)
 
 
+def shutdown_logging() -> None:
+    """
+    Stop the background file-logging listener, if running.
+    
+    Detaches the feeding QueueHandler from the root logger, then flushes
+    any queued records to the log file and closes it.
+    """
+    global _file_listener
+    
+    if _file_listener is not None:
+        root_logger = logging.getLogger()
+        for handler in root_logger.handlers[:]:
+            if isinstance(handler, QueueHandler) and handler.queue is _file_listener.queue:
+                root_logger.removeHandler(handler)
+        _file_listener.stop()
+        for handler in _file_listener.handlers:
+            handler.close()
+        _file_listener = None
+
+
+# Drain file logging once at interpreter exit rather than at app shutdown,
+# so an app started again in the same process (tests) keeps its log file
+atexit.register(shutdown_logging)
+
+
+@lru_cache(maxsize=None)
 def get_logger(name: str) -> logging.Logger:
     """
     Get a logger with the specified name.
     
+    Cached per name, so repeat lookups skip the logging module lock.
+    
     Args:
         name: Logger name (usually __name__)
         
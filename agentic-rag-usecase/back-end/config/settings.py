@@ -3,7 +3,8 @@ Configuration management using Pydantic Settings.
 All configuration is loaded from environment variables (.env file).
 """
 
-from pydantic_settings import BaseSettings
+from functools import cached_property
+from pydantic_settings import BaseSettings, SettingsConfigDict
 from typing import List, Optional
 from pathlib import Path
 
@@ -31,6 +32,11 @@ class Settings(BaseSettings):
     agent_temperature: float = 0.1
     agent_max_tokens: int = 2000
     agent_system_message: Optional[str] = None
+    agent_llm_cache_enabled: bool = True  # Reuse responses to identical prompts
+    agent_llm_cache_size: int = 1000  # Max cached responses (in-memory, per process)
+    agent_tool_cache_ttl: int = 900  # Seconds to reuse identical tool-call results (0 disables)
+    agent_max_threads: int = 1000  # Server-side conversation threads kept in memory (LRU)
+    agent_max_thread_messages: int = 50  # Most recent messages kept per thread, system message included
     
     # ============================================
     # SQL Query Tool Configuration
@@ -48,9 +54,20 @@ class Settings(BaseSettings):
     faiss_chunk_overlap: int = 200
     faiss_cache_enabled: bool = True
     faiss_cache_ttl_days: int = 7
+    faiss_embedding_cache_enabled: bool = True  # Keep chunk embeddings on disk across index rebuilds
+    faiss_hnsw_min_chunks: int = 10000  # Use an approximate HNSW index at/above this size
+    faiss_hnsw_m: int = 32  # HNSW graph neighbors per node
+    faiss_index_type: str = "auto"  # "auto" (flat, HNSW from faiss_hnsw_min_chunks), "flat", "hnsw" or "hnsw_sq8"
     faiss_tool_name: str = "langsmith_search"
     faiss_tool_description: str = "Search for information about LangSmith. For any questions related to LangSmith, you must use this tool."
     
+    # ============================================
+    # HTTP Client (OpenAI connection pool)
+    # ============================================
+    http_max_connections: int = 200
+    http_max_keepalive_connections: int = 100
+    http_timeout: float = 120.0
+    
     # ============================================
     # API Server Configuration
     # ============================================
@@ -102,13 +119,14 @@ class Settings(BaseSettings):
     langchain_api_key: Optional[str] = None
     langchain_project: str = "agentic-rag-api"
     
-    class Config:
-        """Pydantic configuration."""
-        env_file = ".env"
-        env_file_encoding = "utf-8"
-        case_sensitive = False
+    # Pydantic configuration
+    model_config = SettingsConfigDict(
+        env_file=".env",
+        env_file_encoding="utf-8",
+        case_sensitive=False,
+    )
     
-    @property
+    @cached_property
     def cors_origins_list(self) -> List[str]:
         """
         Parse CORS origins from comma-separated string.
@@ -124,7 +142,7 @@ class Settings(BaseSettings):
             if origin.strip()
         ]
     
-    @property
+    @cached_property
     def faiss_urls_list(self) -> List[str]:
         """
         Get list of URLs to index in FAISS.
@@ -138,34 +156,24 @@ class Settings(BaseSettings):
         # Read from urls.txt file if it exists
         urls_file = self.urls_file_full_path
         if urls_file.exists():
-            with open(urls_file, 'r') as f:
-                file_urls = [
-                    line.strip() 
-                    for line in f 
-                    if line.strip() and not line.strip().startswith('#')
-                ]
-                urls.extend(file_urls)
+            text = urls_file.read_text(encoding="utf-8")
+            # Strip each line once; skip blanks and comment lines
+            urls.extend(
+                line for line in map(str.strip, text.splitlines())
+                if line and line[0] != '#'
+            )
         
         # Add additional URLs from environment variable
         if self.faiss_additional_urls:
-            env_urls = [
-                url.strip() 
-                for url in self.faiss_additional_urls.split(",") 
-                if url.strip()
-            ]
-            urls.extend(env_urls)
+            urls.extend(
+                url for url in map(str.strip, self.faiss_additional_urls.split(","))
+                if url
+            )
         
         # Remove duplicates while preserving order
-        seen = set()
-        unique_urls = []
-        for url in urls:
-            if url not in seen:
-                seen.add(url)
-                unique_urls.append(url)
-        
-        return unique_urls
+        return list(dict.fromkeys(urls))
     
-    @property
+    @cached_property
     def base_path(self) -> Path:
         """
         Get the base path of the application.
@@ -175,7 +183,7 @@ class Settings(BaseSettings):
         """
         return Path(__file__).parent.parent
     
-    @property
+    @cached_property
     def crm_database_full_path(self) -> Path:
         """
         Get the full path to the CRM database.
@@ -185,7 +193,7 @@ class Settings(BaseSettings):
         """
         return self.base_path / self.crm_database_path
     
-    @property
+    @cached_property
     def chinook_database_full_path(self) -> Path:
         """
         Get the full path to the Chinook database.
@@ -195,7 +203,7 @@ class Settings(BaseSettings):
         """
         return self.base_path / self.chinook_database_path
     
-    @property
+    @cached_property
     def urls_file_full_path(self) -> Path:
         """
         Get the full path to the URLs file.
@@ -205,7 +213,7 @@ class Settings(BaseSettings):
         """
         return self.base_path / self.faiss_urls_file
     
-    @property
+    @cached_property
     def faiss_cache_dir(self) -> Path:
         """
         Get the FAISS cache directory path.
@@ -215,7 +223,7 @@ class Settings(BaseSettings):
         """
         return self.base_path / ".faiss_cache"
     
-    @property
+    @cached_property
     def faiss_cache_path(self) -> Path:
         """
         Get the FAISS cache file path.
@@ -225,6 +233,16 @@ class Settings(BaseSettings):
         """
         return self.faiss_cache_dir / "faiss_index"
     
+    @cached_property
+    def faiss_embedding_cache_dir(self) -> Path:
+        """
+        Get the chunk embedding cache directory path.
+        
+        Returns:
+            Path to the embeddings directory inside .faiss_cache
+        """
+        return self.faiss_cache_dir / "embeddings"
+    
     def validate_on_startup(self) -> List[str]:
         """
         Validate configuration on application startup.
@@ -251,6 +269,11 @@ class Settings(BaseSettings):
         if self.log_format not in ["text", "json"]:
             errors.append(f"Invalid log format: {self.log_format}. Must be 'text' or 'json'")
         
+        # Validate FAISS index type
+        valid_index_types = ["auto", "flat", "hnsw", "hnsw_sq8"]
+        if self.faiss_index_type not in valid_index_types:
+            errors.append(f"Invalid FAISS index type: {self.faiss_index_type}. Must be one of {valid_index_types}")
+        
         # Validate port
         if not (1024 <= self.api_port <= 65535):
             errors.append(f"Invalid API port: {self.api_port}. Must be between 1024 and 65535")
@@ -261,3 +284,6 @@ class Settings(BaseSettings):
 # Global settings instance
 # This is imported throughout the application
 settings = Settings()
+
+# Read urls.txt once at import so no request path pays for the file I/O
+settings.faiss_urls_list
@@ -9,7 +9,8 @@ import os
 import random
 import shutil
 from pathlib import Path
-from typing import Optional
+from typing import List, Optional
+from sqlalchemy import event
 from config.settings import settings
 from config.logging_config import get_logger
 from .manager import CustomerManager
@@ -48,31 +49,66 @@ STREET_NAMES = [
 ]
 
 
-def generate_indian_address() -> str:
-    """Generate a random Indian address"""
-    city, state, areas = random.choice(INDIAN_CITIES)
-    area = random.choice(areas)
-    street = random.choice(STREET_NAMES)
-    building_no = random.randint(1, 999)
-    pin_code = random.randint(100000, 999999)
-    
-    return f"{building_no}, {street}, {area}, {city}, {state} - {pin_code}"
+EMAIL_DOMAINS = ["gmail.com", "yahoo.in", "outlook.com", "rediffmail.com", "hotmail.com"]
 
 
-def generate_indian_phone() -> str:
-    """Generate a random Indian phone number"""
-    # Indian mobile numbers start with 6-9 and have 10 digits
-    first_digit = random.choice([6, 7, 8, 9])
-    remaining_digits = ''.join([str(random.randint(0, 9)) for _ in range(9)])
-    return f"+91{first_digit}{remaining_digits}"
+def _set_seeding_pragmas(dbapi_connection, connection_record) -> None:
+    """
+    Tune each new SQLite connection for bulk seeding (engine "connect" event)
+    
+    WAL avoids rewriting a rollback journal and, with synchronous=NORMAL,
+    fsyncs at checkpoints rather than on every commit. journal_mode is
+    stored in the database file; the others only apply per connection.
+    """
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.close()
 
 
-def generate_email(name: str) -> str:
-    """Generate email from name"""
-    domains = ["gmail.com", "yahoo.in", "outlook.com", "rediffmail.com", "hotmail.com"]
-    clean_name = name.lower().replace(" ", ".")
-    random_num = random.randint(1, 999)
-    return f"{clean_name}{random_num}@{random.choice(domains)}"
+def generate_customers(count: int) -> List[dict]:
+    """
+    Generate random India-based customer rows
+    
+    Each field is drawn for all rows at once with random.choices rather
+    than one random call per field per customer. The row index is part of
+    the email, so emails are unique without retrying.
+    
+    Args:
+        count: Number of customer rows to generate
+        
+    Returns:
+        List of customer dicts ready for CustomerManager.bulk_create_customers
+    """
+    first_names = random.choices(FIRST_NAMES, k=count)
+    last_names = random.choices(LAST_NAMES, k=count)
+    cities = random.choices(INDIAN_CITIES, k=count)
+    streets = random.choices(STREET_NAMES, k=count)
+    building_nos = random.choices(range(1, 1000), k=count)
+    pin_codes = random.choices(range(100000, 1000000), k=count)
+    # Indian mobile numbers start with 6-9 and have 10 digits
+    phone_firsts = random.choices((6, 7, 8, 9), k=count)
+    phone_rests = random.choices(range(10 ** 9), k=count)
+    domains = random.choices(EMAIL_DOMAINS, k=count)
+    statuses = random.choices(("active", "inactive"), weights=(3, 1), k=count)  # 75% active
+    
+    rows = []
+    for i in range(count):
+        first_name, last_name = first_names[i], last_names[i]
+        city, state, areas = cities[i]
+        rows.append({
+            "name": f"{first_name} {last_name}",
+            "address": (
+                f"{building_nos[i]}, {streets[i]}, {random.choice(areas)}, "
+                f"{city}, {state} - {pin_codes[i]}"
+            ),
+            "email": f"{first_name.lower()}.{last_name.lower()}{i + 1}@{domains[i]}",
+            "phone": f"+91{phone_firsts[i]}{phone_rests[i]:09d}",
+            "credit": round(random.uniform(0, 100000), 2),  # Credit between 0 and 1 lakh
+            "active_status": statuses[i],
+        })
+    return rows
 
 
 def setup_crm_database(sample_records: int = 25) -> bool:
@@ -95,62 +131,70 @@ def setup_crm_database(sample_records: int = 25) -> bool:
         db_dir = db_path.parent
         db_dir.mkdir(parents=True, exist_ok=True)
         
+        # CustomerManager creates the customers table on construction, so a
+        # table check afterwards always passes; whether the file existed
+        # beforehand is what tells a fresh database apart
+        is_new_database = not db_path.exists() or db_path.stat().st_size == 0
+        
         # Initialize CustomerManager (creates tables automatically)
         db_uri = f"sqlite:///{db_path}"
         manager = CustomerManager(db_uri)
         
-        # Check if database already has data
-        existing_count = manager.get_customer_count()
+        # Apply the seeding pragmas to every connection this engine opens;
+        # dispose() drops the one pooled while the tables were created
+        event.listen(manager.engine, "connect", _set_seeding_pragmas)
+        manager.engine.dispose()
+        
+        # Check if database already has data (a fresh file cannot)
+        existing_count = 0 if is_new_database else manager.get_customer_count()
         if existing_count > 0:
-            logger.info(f"CRM database already has {existing_count} customers. Skipping sample data generation.")
+            logger.info("CRM database already has %d customers. Skipping sample data generation.", existing_count)
             return True
         
         # Generate sample customer records
-        logger.info(f"Generating {sample_records} sample customer records...")
+        logger.info("Generating %d sample customer records...", sample_records)
         
-        created_count = 0
-        attempts = 0
-        max_attempts = sample_records * 3  # Avoid infinite loop with duplicate emails
-        
-        while created_count < sample_records and attempts < max_attempts:
-            attempts += 1
-            
-            # Generate random customer data
-            first_name = random.choice(FIRST_NAMES)
-            last_name = random.choice(LAST_NAMES)
-            name = f"{first_name} {last_name}"
-            
-            address = generate_indian_address()
-            email = generate_email(name)
-            phone = generate_indian_phone()
-            credit = round(random.uniform(0, 100000), 2)  # Credit between 0 and 1 lakh
-            active_status = random.choice(["active", "active", "active", "inactive"])  # 75% active
-            
-            # Try to create customer
-            customer = manager.create_customer(
-                name=name,
-                address=address,
-                email=email,
-                phone=phone,
-                credit=credit,
-                active_status=active_status
+        rows = generate_customers(sample_records)
+        created_count = manager.bulk_create_customers(rows)
+        if created_count != len(rows):
+            logger.error(
+                "CRM seeding failed: %d of %d sample customers inserted (integrity error)",
+                created_count, len(rows)
             )
-            
-            if customer:
-                created_count += 1
-                if created_count % 10 == 0:
-                    logger.info(f"Created {created_count}/{sample_records} customers...")
+            return False
         
-        logger.info(f"✓ CRM database setup complete! Created {created_count} sample customers.")
-        logger.info(f"  Database location: {db_path}")
+        logger.info("✓ CRM database setup complete! Created %d sample customers.", created_count)
+        logger.info("  Database location: %s", db_path)
         
         return True
         
     except Exception as e:
-        logger.error(f"Error setting up CRM database: {str(e)}", exc_info=True)
+        logger.exception("Error setting up CRM database: %s", e)
         return False
 
 
+def find_chinook_source() -> Optional[Path]:
+    """
+    Locate the seeded Chinook database shipped with the workspace
+    
+    Returns:
+        Path to the first non-empty candidate file, or None if none exists
+    """
+    workspace_root = Path(__file__).parent.parent.parent
+    source_candidates = [
+        workspace_root / "lc-training-data" / "chinook.db",
+        workspace_root / "lc-training-data" / "Chinook_Sqlite.db",
+        workspace_root / "db" / "chinook.db"
+    ]
+    
+    for candidate in source_candidates:
+        if candidate.exists() and candidate.stat().st_size > 0:
+            logger.info("Found source Chinook database: %s", candidate)
+            return candidate
+    
+    return None
+
+
 def setup_chinook_database() -> bool:
     """
     Setup Chinook database (music store)
@@ -175,25 +219,13 @@ def setup_chinook_database() -> bool:
         if target_db_path.exists():
             file_size = target_db_path.stat().st_size
             if file_size > 0:
-                logger.info(f"✓ Chinook database already exists at {target_db_path} ({file_size:,} bytes)")
+                logger.info("✓ Chinook database already exists at %s (%s bytes)", target_db_path, f"{file_size:,}")
                 return True
             else:
-                logger.warning(f"Chinook database file exists but is empty. Will attempt to copy source.")
+                logger.warning("Chinook database file exists but is empty. Will attempt to copy source.")
         
         # Look for source database in workspace
-        workspace_root = Path(__file__).parent.parent.parent
-        source_candidates = [
-            workspace_root / "lc-training-data" / "chinook.db",
-            workspace_root / "lc-training-data" / "Chinook_Sqlite.db",
-            workspace_root / "db" / "chinook.db"
-        ]
-        
-        source_db_path = None
-        for candidate in source_candidates:
-            if candidate.exists() and candidate.stat().st_size > 0:
-                source_db_path = candidate
-                logger.info(f"Found source Chinook database: {source_db_path}")
-                break
+        source_db_path = find_chinook_source()
         
         if source_db_path is None:
             logger.warning(
@@ -202,31 +234,53 @@ def setup_chinook_database() -> bool:
             )
             return False
         
-        # Copy database file
-        logger.info(f"Copying Chinook database from {source_db_path} to {target_db_path}...")
+        # Copy rather than hardlink: the SQL tool opens the target
+        # read-write and runs LLM-generated SQL, which must never reach the
+        # git-tracked source file through a shared inode
+        logger.info("Copying Chinook database from %s to %s...", source_db_path, target_db_path)
         shutil.copy2(source_db_path, target_db_path)
         
         file_size = target_db_path.stat().st_size
-        logger.info(f"✓ Chinook database setup complete! ({file_size:,} bytes)")
-        logger.info(f"  Database location: {target_db_path}")
+        logger.info("✓ Chinook database setup complete! (%s bytes)", f"{file_size:,}")
+        logger.info("  Database location: %s", target_db_path)
         
         return True
         
     except Exception as e:
-        logger.error(f"Error setting up Chinook database: {str(e)}", exc_info=True)
+        logger.exception("Error setting up Chinook database: %s", e)
         return False
 
 
-def initialize_databases(crm_sample_records: int = 25) -> dict:
+def _initialized_sentinel() -> Path:
+    """Marker file written after a fully successful initialization"""
+    return settings.crm_database_full_path.parent / ".initialized"
+
+
+def initialize_databases(crm_sample_records: int = 25, force: bool = False) -> dict:
     """
     Initialize all databases for the application
     
+    After a run where every database succeeds, a sentinel file is written
+    next to the CRM database. Later startups skip the setup entirely while
+    the sentinel and both database files are present.
+    
     Args:
         crm_sample_records: Number of sample CRM records to generate (default: 25)
+        force: Run the setup even if the sentinel file exists
         
     Returns:
         Dictionary with initialization results for each database
     """
+    sentinel = _initialized_sentinel()
+    if (
+        not force
+        and sentinel.exists()
+        and settings.crm_database_full_path.exists()
+        and settings.chinook_database_full_path.exists()
+    ):
+        logger.info("Databases already initialized (%s). Skipping setup.", sentinel)
+        return {'crm': True, 'chinook': True}
+    
     logger.info("=" * 60)
     logger.info("DATABASE INITIALIZATION")
     logger.info("=" * 60)
@@ -245,10 +299,13 @@ def initialize_databases(crm_sample_records: int = 25) -> dict:
     # Summary
     logger.info("=" * 60)
     logger.info("DATABASE INITIALIZATION SUMMARY")
-    logger.info(f"  CRM Database: {'✓ SUCCESS' if results['crm'] else '✗ FAILED'}")
-    logger.info(f"  Chinook Database: {'✓ SUCCESS' if results['chinook'] else '✗ FAILED'}")
+    logger.info("  CRM Database: %s", "✓ SUCCESS" if results["crm"] else "✗ FAILED")
+    logger.info("  Chinook Database: %s", "✓ SUCCESS" if results["chinook"] else "✗ FAILED")
     logger.info("=" * 60)
     
+    if all(results.values()):
+        sentinel.touch()
+    
     return results
 
 
@@ -11,14 +11,19 @@ from .models import Base, Customer, ActiveStatus
 class CustomerManager:
     """Manager class to handle all customer-related database operations"""
     
-    def __init__(self, db_path: str = "sqlite:///db/crm.db"):
+    def __init__(self, db_path: str = "sqlite:///db/crm.db", **engine_options):
         """
         Initialize CustomerManager with database connection
         
         Args:
             db_path: Database connection string (default: SQLite database)
+            **engine_options: Extra create_engine() arguments (e.g. poolclass);
+                              override the defaults below
         """
-        self.engine = create_engine(db_path, echo=False)
+        # The engine is cached for the app's lifetime (see api.dependencies),
+        # so pooled connections are checked before reuse
+        options = {"echo": False, "pool_pre_ping": True, **engine_options}
+        self.engine = create_engine(db_path, **options)
         Base.metadata.create_all(self.engine)
         self.SessionLocal = sessionmaker(bind=self.engine)
     
@@ -64,6 +69,37 @@ class CustomerManager:
         finally:
             session.close()
     
+    def bulk_create_customers(self, rows: List[dict]) -> int:
+        """
+        Insert many customer records in a single transaction
+        
+        Skips the ORM unit of work and issues one executemany INSERT, so
+        seeding pays for a single commit instead of one per row. Emails
+        must already be unique; a duplicate rolls back the whole batch.
+        
+        Args:
+            rows: Customer dicts with name, address, email, phone, credit
+                  and active_status ('active'/'inactive' or ActiveStatus)
+            
+        Returns:
+            Number of customers inserted (0 on integrity error)
+        """
+        if not rows:
+            return 0
+        # Normalized copies, so the caller's dicts are left untouched
+        values = []
+        for row in rows:
+            status = row.get("active_status", ActiveStatus.ACTIVE)
+            if not isinstance(status, ActiveStatus):
+                status = ActiveStatus.ACTIVE if status.lower() == "active" else ActiveStatus.INACTIVE
+            values.append({**row, "active_status": status})
+        try:
+            with self.engine.begin() as conn:
+                conn.execute(Customer.__table__.insert(), values)
+        except IntegrityError:
+            return 0
+        return len(rows)
+    
     def get_customer(self, customer_id: int) -> Optional[Customer]:
         """
         Retrieve a customer by ID
@@ -2,18 +2,21 @@
 Agentic RAG REST API
 Main application entry point with FastAPI
 """
+import asyncio
 import uvicorn
 from contextlib import asynccontextmanager
+from typing import Any, Dict, Optional
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, ORJSONResponse
 from fastapi.exceptions import RequestValidationError
 from starlette.exceptions import HTTPException as StarletteHTTPException
 from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
-from config.settings import settings
+from config.settings import Settings, settings
 from config.logging_config import setup_logging, get_logger
+from utils.http_clients import open_http_clients, close_http_clients
 from api.routes import router
 from api.middleware import (
     http_exception_handler,
@@ -21,34 +24,43 @@ from api.middleware import (
     general_exception_handler,
     RequestLoggingMiddleware
 )
-from db.init_databases import initialize_databases
-from services.agent_service import agent_service
-from services.faiss_service import faiss_service
 
 
-# Setup logging
-setup_logging(
-    log_level=settings.log_level,
-    log_format=settings.log_format,
-    log_file_enabled=settings.log_file_enabled,
-    log_file_path=settings.log_file_path
-)
-
 logger = get_logger(__name__)
 
 
+def _initialize_faiss(faiss_service) -> None:
+    """
+    Initialize the FAISS service, continuing without it on failure
+    
+    Args:
+        faiss_service: FAISS service instance
+    """
+    logger.info("\nInitializing FAISS service...")
+    try:
+        faiss_service.initialize()
+    except Exception as e:
+        logger.warning("FAISS initialization failed (continuing without it): %s", e)
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """
     Lifespan context manager for application startup and shutdown
     
     Startup:
+    - Open the shared HTTP client pools
     - Initialize databases
     - Initialize FAISS service
     - Initialize agent service
+    - Store services on app.state for dependency injection
     
     Shutdown:
+    - Close the shared HTTP client pools
     - Clean up resources
+    
+    Database and service modules are imported here rather than at module
+    level, so importing the app (reload workers, tests) stays fast.
     """
     # Startup
     logger.info("=" * 70)
@@ -60,37 +72,45 @@ async def lifespan(app: FastAPI):
         logger.info("Validating configuration...")
         errors = settings.validate_on_startup()
         if errors:
-            logger.warning(f"Configuration warnings: {len(errors)}")
+            logger.warning("Configuration warnings: %d", len(errors))
             for error in errors:
-                logger.warning(f"  - {error}")
+                logger.warning("  - %s", error)
         
-        # Initialize databases
-        logger.info("\nInitializing databases...")
-        db_results = initialize_databases(crm_sample_records=25)
+        # Connection pools for OpenAI calls, bound to this event loop
+        open_http_clients()
         
-        # Initialize FAISS service (optional - continues if fails)
-        logger.info("\nInitializing FAISS service...")
-        try:
-            faiss_service.initialize()
-        except Exception as e:
-            logger.warning(f"FAISS initialization failed (continuing without it): {str(e)}")
+        # Initialize databases and FAISS service (optional - continues if
+        # fails); they share no state, so the blocking setups run in threads
+        # and overlap, e.g. SQLite writes during OpenAI embedding calls
+        from db.init_databases import initialize_databases
+        from services.faiss_service import faiss_service
+        logger.info("\nInitializing databases...")
+        db_results, _ = await asyncio.gather(
+            asyncio.to_thread(initialize_databases, crm_sample_records=25),
+            asyncio.to_thread(_initialize_faiss, faiss_service)
+        )
         
         # Initialize agent service
         logger.info("\nInitializing agent service...")
+        from services.agent_service import agent_service
         agent_success = agent_service.initialize()
         
         if not agent_success:
             logger.error("Failed to initialize agent service!")
             raise RuntimeError("Agent service initialization failed")
         
+        # Expose initialized services to request dependencies
+        app.state.agent_service = agent_service
+        app.state.faiss_service = faiss_service
+        
         logger.info("\n" + "=" * 70)
         logger.info("STARTUP COMPLETE ✓")
-        logger.info(f"API Server: http://{settings.api_host}:{settings.api_port}")
-        logger.info(f"Documentation: http://{settings.api_host}:{settings.api_port}{settings.docs_url}")
+        logger.info("API Server: http://%s:%s", settings.api_host, settings.api_port)
+        logger.info("Documentation: http://%s:%s%s", settings.api_host, settings.api_port, settings.docs_url)
         logger.info("=" * 70 + "\n")
         
     except Exception as e:
-        logger.error(f"Startup failed: {str(e)}", exc_info=True)
+        logger.error("Startup failed: %s", e, exc_info=True)
         raise
     
     yield
@@ -100,13 +120,12 @@ async def lifespan(app: FastAPI):
     logger.info("AGENTIC RAG API - SHUTDOWN")
     logger.info("=" * 70)
     logger.info("Cleaning up resources...")
+    await close_http_clients()
     logger.info("Shutdown complete")
 
 
-# Create FastAPI app
-app = FastAPI(
-    title="Agentic RAG REST API",
-    description="""
+# OpenAPI description shown on the docs page
+_API_DESCRIPTION = """
     Multi-tool agentic RAG system with LangGraph ReAct agent.
     
     ## Features
@@ -127,58 +146,97 @@ app = FastAPI(
     ## Authentication
     
     No authentication required (development mode).
-    """,
-    version="1.0.0",
-    docs_url=settings.docs_url if settings.docs_enabled else None,
-    redoc_url=settings.redoc_url if settings.docs_enabled else None,
-    openapi_url=settings.openapi_url if settings.docs_enabled else None,
-    lifespan=lifespan
-)
+    """
 
-# Exception handlers (must be registered before middleware)
-app.add_exception_handler(StarletteHTTPException, http_exception_handler)
-app.add_exception_handler(RequestValidationError, validation_exception_handler)
-app.add_exception_handler(Exception, general_exception_handler)
-logger.info("Exception handlers registered")
-
-# Request logging middleware
-app.add_middleware(RequestLoggingMiddleware)
-logger.info("Request logging middleware enabled")
-
-# CORS middleware
-if settings.cors_enabled:
-    app.add_middleware(
-        CORSMiddleware,
-        allow_origins=settings.cors_origins_list,
-        allow_credentials=True,
-        allow_methods=["*"],
-        allow_headers=["*"],
+
+def create_app(config: Optional[Dict[str, Any]] = None) -> FastAPI:
+    """
+    Build the FastAPI application
+    
+    Args:
+        config: Optional settings overrides (field name -> value), e.g.
+                {"rate_limit_enabled": False}; defaults to the loaded settings
+    
+    Returns:
+        Configured FastAPI app with handlers, middleware and routes
+    """
+    # A fresh instance, not model_copy(): the copy would keep cached_property
+    # values (cors_origins_list, *_full_path) derived from the old fields
+    app_settings = Settings(**{**settings.model_dump(), **config}) if config else settings
+    
+    app = FastAPI(
+        title="Agentic RAG REST API",
+        description=_API_DESCRIPTION,
+        version="1.0.0",
+        docs_url=app_settings.docs_url if app_settings.docs_enabled else None,
+        redoc_url=app_settings.redoc_url if app_settings.docs_enabled else None,
+        openapi_url=app_settings.openapi_url if app_settings.docs_enabled else None,
+        default_response_class=ORJSONResponse,
+        lifespan=lifespan
     )
-    logger.info(f"CORS enabled for origins: {settings.cors_origins_list}")
-
-# Rate limiting
-if settings.rate_limit_enabled:
-    limiter = Limiter(key_func=get_remote_address)
-    app.state.limiter = limiter
-    app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
-    logger.info(f"Rate limiting enabled: {settings.rate_limit_per_minute}/min, {settings.rate_limit_per_hour}/hour")
-
-# Include routes
-app.include_router(router, prefix="", tags=["Agentic RAG"])
-
-
-# Root endpoint
-@app.get("/", include_in_schema=False)
-async def root():
-    """Root endpoint - redirect to docs"""
-    return JSONResponse(
-        content={
-            "message": "Agentic RAG REST API",
-            "version": "1.0.0",
-            "docs": f"http://{settings.api_host}:{settings.api_port}{settings.docs_url}",
-            "health": f"http://{settings.api_host}:{settings.api_port}/health"
-        }
+    
+    # Exception handlers (must be registered before middleware)
+    app.add_exception_handler(StarletteHTTPException, http_exception_handler)
+    app.add_exception_handler(RequestValidationError, validation_exception_handler)
+    app.add_exception_handler(Exception, general_exception_handler)
+    logger.info("Exception handlers registered")
+    
+    # Request logging middleware
+    app.add_middleware(RequestLoggingMiddleware)
+    logger.info("Request logging middleware enabled")
+    
+    # CORS middleware
+    if app_settings.cors_enabled:
+        # Frozen so the middleware and any later readers share one immutable value
+        cors_origins = tuple(app_settings.cors_origins_list)
+        app.add_middleware(
+            CORSMiddleware,
+            allow_origins=cors_origins,
+            allow_credentials=True,
+            allow_methods=["*"],
+            allow_headers=["*"],
+        )
+        logger.info("CORS enabled for origins: %s", cors_origins)
+    
+    # Rate limiting
+    if app_settings.rate_limit_enabled:
+        limiter = Limiter(key_func=get_remote_address)
+        app.state.limiter = limiter
+        app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
+        logger.info("Rate limiting enabled: %s/min, %s/hour", app_settings.rate_limit_per_minute, app_settings.rate_limit_per_hour)
+    
+    # Include routes
+    app.include_router(router, prefix="", tags=["Agentic RAG"])
+    
+    # Root endpoint
+    @app.get("/", include_in_schema=False)
+    async def root():
+        """Root endpoint - redirect to docs"""
+        return JSONResponse(
+            content={
+                "message": "Agentic RAG REST API",
+                "version": "1.0.0",
+                "docs": f"http://{app_settings.api_host}:{app_settings.api_port}{app_settings.docs_url}",
+                "health": f"http://{app_settings.api_host}:{app_settings.api_port}/health"
+            }
+        )
+    
+    return app
+
+
+# Application used by uvicorn ("main:app") and the tests. Not built when this
+# file runs as a script (uvicorn imports it again as "main") or is re-imported
+# as __mp_main__ by spawned process-pool workers, e.g. the text splitter's
+if __name__ not in ("__main__", "__mp_main__"):
+    # Setup logging
+    setup_logging(
+        log_level=settings.log_level,
+        log_format=settings.log_format,
+        log_file_enabled=settings.log_file_enabled,
+        log_file_path=settings.log_file_path
     )
+    
+    app = create_app()
 
 
 def main():
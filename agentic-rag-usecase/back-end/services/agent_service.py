@@ -2,19 +2,105 @@
 Agent Service for Agentic RAG API
 Manages LangGraph ReAct agent with all tools
 """
-from typing import Optional, List, Dict, Any, AsyncIterator
+import json
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Optional, List, Dict, Any, AsyncIterator, Tuple
 from langchain_openai import ChatOpenAI
-from langchain_core.messages import HumanMessage, SystemMessage, AIMessage
+from langchain_core.caches import InMemoryCache
+from langchain_core.globals import get_llm_cache, set_llm_cache
+from langchain_core.messages import (
+    BaseMessage, HumanMessage, SystemMessage, AIMessage, trim_messages
+)
+from langchain_core.tools import BaseTool, StructuredTool
 from langgraph.prebuilt import create_react_agent
 from config.settings import settings
 from config.logging_config import get_logger
 from tools.search_tools import get_all_search_tools
 from tools.crm_tools import get_all_crm_tools
 from tools.sql_tools import get_sql_tool
+from utils.http_clients import get_http_client, get_async_http_client
 from services.faiss_service import faiss_service
 
 logger = get_logger(__name__)
 
+# Message class for each conversation_history role; other roles are skipped
+_MESSAGE_CLASS_BY_ROLE = {
+    "user": HumanMessage,
+    "assistant": AIMessage,
+}
+
+# Slash commands answered without calling the LLM, with their help text
+_COMMANDS = {
+    "/help": "Show available commands",
+    "/tools": "List the agent's tools",
+    "/status": "Show agent status",
+}
+
+# Max distinct argument sets remembered per tool
+_TOOL_CACHE_MAX_ENTRIES = 256
+
+# Marks a tool cache miss, so None/empty results are cached like any other
+_CACHE_MISS = object()
+
+
+def _with_result_cache(tool: BaseTool, ttl: float) -> BaseTool:
+    """
+    Wrap a read-only tool so identical calls within ttl reuse the result
+    
+    ReAct loops often repeat the same lookup (same Wikipedia title, same
+    customer, same retrieval query); repeats are answered from memory.
+    
+    Args:
+        tool: Tool to wrap
+        ttl: Seconds a result stays valid
+        
+    Returns:
+        StructuredTool with the same name, description and args schema
+    """
+    cache: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+    # ToolNode runs parallel tool calls on executor threads
+    cache_lock = threading.Lock()
+    
+    def lookup(kwargs: Dict[str, Any]) -> Tuple[str, Any]:
+        key = json.dumps(kwargs, sort_keys=True, default=str)
+        with cache_lock:
+            entry = cache.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                cache.move_to_end(key)
+                return key, entry[1]
+        return key, _CACHE_MISS
+    
+    def store(key: str, result: Any) -> Any:
+        with cache_lock:
+            cache[key] = (time.monotonic() + ttl, result)
+            cache.move_to_end(key)
+            if len(cache) > _TOOL_CACHE_MAX_ENTRIES:
+                cache.popitem(last=False)
+        return result
+    
+    def run(**kwargs: Any) -> Any:
+        key, result = lookup(kwargs)
+        if result is _CACHE_MISS:
+            result = store(key, tool.invoke(kwargs))
+        return result
+    
+    async def arun(**kwargs: Any) -> Any:
+        key, result = lookup(kwargs)
+        if result is _CACHE_MISS:
+            result = store(key, await tool.ainvoke(kwargs))
+        return result
+    
+    return StructuredTool.from_function(
+        func=run,
+        coroutine=arun,
+        name=tool.name,
+        description=tool.description,
+        args_schema=tool.args_schema
+    )
+
 
 class AgentService:
     """
@@ -30,27 +116,44 @@ class AgentService:
     
     _instance: Optional['AgentService'] = None
     _initialized: bool = False
+    _lock = threading.Lock()
     
     def __new__(cls):
         """Singleton pattern: ensure only one instance exists"""
         if cls._instance is None:
-            cls._instance = super(AgentService, cls).__new__(cls)
+            with cls._lock:
+                if cls._instance is None:
+                    cls._instance = super(AgentService, cls).__new__(cls)
         return cls._instance
     
     def __init__(self):
         """Initialize Agent service (only once)"""
-        if not AgentService._initialized:
-            self.llm: Optional[ChatOpenAI] = None
-            self.tools: List = []
-            self.agent_executor = None
-            self.system_message: Optional[str] = settings.agent_system_message
-            AgentService._initialized = True
-            logger.info("AgentService instance created")
+        if AgentService._initialized:
+            return
+        with AgentService._lock:
+            if not AgentService._initialized:
+                self.llm: Optional[ChatOpenAI] = None
+                self.tools: List = []
+                self.agent_executor = None
+                self.system_message: Optional[str] = settings.agent_system_message
+                # Prefix of every new conversation, built once
+                self._system_msgs: List[BaseMessage] = (
+                    [SystemMessage(content=self.system_message)] if self.system_message else []
+                )
+                # Server-side conversation threads, least recently used first
+                self._threads: "OrderedDict[str, List[BaseMessage]]" = OrderedDict()
+                self._threads_lock = threading.Lock()
+                self._init_lock = threading.Lock()
+                self._refresh_info()
+                AgentService._initialized = True
+                logger.info("AgentService instance created")
     
     def initialize(self) -> bool:
         """
         Initialize agent with LLM and all tools
         
+        Safe to call from several threads; only one of them builds the agent.
+        
         Returns:
             True if successful, False otherwise
         """
@@ -58,18 +161,39 @@ class AgentService:
             logger.info("Agent executor already initialized")
             return True
         
+        with self._init_lock:
+            # Another thread may have finished while this one waited
+            if self.agent_executor is not None:
+                return True
+            return self._initialize()
+    
+    def _initialize(self) -> bool:
+        """
+        Build the LLM, tools and executor (caller holds _init_lock)
+        
+        Returns:
+            True if successful, False otherwise
+        """
         try:
             logger.info("=" * 60)
             logger.info("AGENT INITIALIZATION")
             logger.info("=" * 60)
             
+            # Enable the process-wide LLM cache so repeated identical prompts
+            # (common within ReAct loops) skip the API round-trip
+            if settings.agent_llm_cache_enabled and get_llm_cache() is None:
+                set_llm_cache(InMemoryCache(maxsize=settings.agent_llm_cache_size))
+                logger.info(f"  ✓ LLM cache enabled (max {settings.agent_llm_cache_size} entries)")
+            
             # Initialize LLM
             logger.info(f"Initializing LLM: {settings.agent_model_name}")
             self.llm = ChatOpenAI(
                 model=settings.agent_model_name,
                 max_tokens=settings.agent_max_tokens,
                 temperature=settings.agent_temperature,
-                openai_api_key=settings.openai_api_key
+                openai_api_key=settings.openai_api_key,
+                http_client=get_http_client(),
+                http_async_client=get_async_http_client()
             )
             logger.info("  ✓ LLM initialized")
             
@@ -102,6 +226,14 @@ class AgentService:
             if retriever_tool:
                 self.tools.append(retriever_tool)
             
+            # All tools are read-only lookups, so repeated calls can be cached
+            if settings.agent_tool_cache_ttl > 0:
+                self.tools = [
+                    _with_result_cache(tool, settings.agent_tool_cache_ttl)
+                    for tool in self.tools
+                ]
+                logger.info(f"  ✓ Tool result cache enabled (TTL {settings.agent_tool_cache_ttl}s)")
+            
             logger.info(f"Total tools loaded: {len(self.tools)}")
             logger.info("\nTools available:")
             for i, tool in enumerate(self.tools, 1):
@@ -115,6 +247,8 @@ class AgentService:
             )
             logger.info("  ✓ ReAct agent created")
             
+            self._refresh_info()
+            
             logger.info("=" * 60)
             logger.info("AGENT INITIALIZATION COMPLETE ✓")
             logger.info(f"  Model: {settings.agent_model_name}")
@@ -127,7 +261,156 @@ class AgentService:
             logger.error(f"Error initializing agent: {str(e)}", exc_info=True)
             return False
     
-    def invoke(self, message: str, conversation_history: Optional[List[Dict]] = None) -> Dict[str, Any]:
+    def _refresh_info(self) -> None:
+        """Rebuild the cached tool list and status fields after the tools change"""
+        self._tools_info = [
+            {"name": tool.name, "description": tool.description}
+            for tool in self.tools
+        ]
+        self._static_info = {
+            'model': settings.agent_model_name if self.llm else None,
+            'tools_count': len(self.tools),
+            'tools': [tool.name for tool in self.tools],
+            'system_message': self.system_message
+        }
+    
+    def _evict_threads(self) -> None:
+        """Drop least recently used threads beyond the limit (lock held)"""
+        while len(self._threads) > settings.agent_max_threads:
+            self._threads.popitem(last=False)
+    
+    def open_thread(self, thread_id: Optional[str]) -> Optional[str]:
+        """
+        Resolve a client-supplied thread id to a server-issued one
+        
+        Known ids are kept; any other value starts a new thread under a
+        random id, so a thread can only be continued with an id this server
+        handed out, never one the caller picked or guessed.
+        
+        Args:
+            thread_id: Thread identifier from the request (None for stateless calls)
+        
+        Returns:
+            Server-issued thread id, or None for stateless calls
+        """
+        if thread_id is None:
+            return None
+        with self._threads_lock:
+            if thread_id in self._threads:
+                return thread_id
+            new_id = uuid.uuid4().hex
+            self._threads[new_id] = []
+            self._evict_threads()
+            return new_id
+    
+    def _get_thread(self, thread_id: Optional[str]) -> Optional[List[BaseMessage]]:
+        """
+        Get a copy of a stored conversation thread
+        
+        Args:
+            thread_id: Server-issued thread identifier (None for stateless calls)
+        
+        Returns:
+            Stored messages, or None if the thread is new or unknown
+        """
+        if thread_id is None:
+            return None
+        with self._threads_lock:
+            messages = self._threads.get(thread_id)
+            if not messages:
+                return None
+            self._threads.move_to_end(thread_id)
+            return list(messages)
+    
+    def _save_thread(self, thread_id: Optional[str], messages: List[BaseMessage]) -> None:
+        """
+        Store a conversation thread, evicting the least recently used ones
+        
+        Only the most recent messages are kept, starting on a user message so
+        tool calls are never separated from their results.
+        
+        Args:
+            thread_id: Server-issued thread identifier (None for stateless calls)
+            messages: Full message list after the latest turn
+        """
+        if thread_id is None:
+            return
+        messages = trim_messages(
+            messages,
+            max_tokens=settings.agent_max_thread_messages,
+            token_counter=len,
+            strategy="last",
+            start_on="human",
+            include_system=True
+        )
+        with self._threads_lock:
+            self._threads[thread_id] = messages
+            self._threads.move_to_end(thread_id)
+            self._evict_threads()
+    
+    def _build_messages(self, message: str, conversation_history: Optional[List[Dict]],
+                        thread_id: Optional[str]) -> List[BaseMessage]:
+        """
+        Build the agent input messages for one turn
+        
+        Continues the stored thread if there is one; otherwise starts from
+        the system message and the supplied conversation history.
+        
+        Args:
+            message: User message/question
+            conversation_history: Optional list of previous messages
+            thread_id: Optional server-side thread
+        
+        Returns:
+            Messages ending with the new user message
+        """
+        messages = self._get_thread(thread_id)
+        if messages is None:
+            messages = list(self._system_msgs)
+            if conversation_history:
+                for msg in conversation_history:
+                    message_class = _MESSAGE_CLASS_BY_ROLE.get(msg.get("role"))
+                    if message_class is not None:
+                        messages.append(message_class(content=msg.get("content", "")))
+        
+        messages.append(HumanMessage(content=message))
+        return messages
+    
+    def _dispatch_command(self, message: str) -> Optional[AIMessage]:
+        """
+        Answer a known slash command directly, without calling the LLM
+        
+        Commands are not stored in server-side threads, so they never
+        become part of the model's context.
+        
+        Args:
+            message: User message/question
+        
+        Returns:
+            Assistant reply, or None if the message is not a known command
+        """
+        words = message.split(maxsplit=1)
+        command = words[0].lower() if words else ""
+        if command not in _COMMANDS:
+            return None
+        
+        if command == "/help":
+            lines = [f"{name} - {description}" for name, description in _COMMANDS.items()]
+        elif command == "/tools":
+            lines = [f"{tool['name']}: {tool['description']}" for tool in self.get_tools_info()]
+        else:
+            info = self.get_info()
+            lines = [
+                f"Ready: {info['initialized']}",
+                f"Model: {info['model']}",
+                f"Tools: {info['tools_count']}"
+            ]
+        
+        logger.info(f"Answered {command} without invoking the agent")
+        return AIMessage(content="\n".join(lines))
+    
+    def invoke(self, message: str, conversation_history: Optional[List[Dict]] = None,
+               thread_id: Optional[str] = None) -> Dict[str, Any]:
         """
         Invoke agent with a message (blocking call)
         
@@ -135,6 +418,9 @@ class AgentService:
             message: User message/question
             conversation_history: Optional list of previous messages
                                  Format: [{"role": "user|assistant", "content": "..."}]
+            thread_id: Optional server-side thread from open_thread(); when it
+                       is already stored, only the new message is added to the
+                       kept history
         
         Returns:
             Dictionary with full response including message history
@@ -143,27 +429,18 @@ class AgentService:
             self.initialize()
         
         try:
-            # Build message list
-            messages = []
-            
-            # Add system message if configured
-            if self.system_message:
-                messages.append(SystemMessage(content=self.system_message))
-            
-            # Add conversation history if provided
-            if conversation_history:
-                for msg in conversation_history:
-                    if msg.get("role") == "user":
-                        messages.append(HumanMessage(content=msg.get("content", "")))
-                    elif msg.get("role") == "assistant":
-                        messages.append(AIMessage(content=msg.get("content", "")))
+            thread_id = self.open_thread(thread_id)
+            messages = self._build_messages(message, conversation_history, thread_id)
             
-            # Add current message
-            messages.append(HumanMessage(content=message))
+            reply = self._dispatch_command(message)
+            if reply is not None:
+                messages.append(reply)
+                return {"messages": messages}
             
             # Invoke agent
             logger.info(f"Invoking agent with message: {message[:100]}...")
             result = self.agent_executor.invoke({"messages": messages})
+            self._save_thread(thread_id, result["messages"])
             
             logger.info("Agent invocation complete")
             return result
@@ -172,13 +449,52 @@ class AgentService:
             logger.error(f"Error invoking agent: {str(e)}", exc_info=True)
             raise
     
-    async def stream(self, message: str, conversation_history: Optional[List[Dict]] = None) -> AsyncIterator[Dict[str, Any]]:
+    async def ainvoke(self, message: str, conversation_history: Optional[List[Dict]] = None,
+                      thread_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Invoke agent with a message without blocking the event loop
+        
+        Args:
+            message: User message/question
+            conversation_history: Optional list of previous messages
+            thread_id: Optional server-side thread (see invoke)
+        
+        Returns:
+            Dictionary with full response including message history
+        """
+        if self.agent_executor is None:
+            self.initialize()
+        
+        try:
+            thread_id = self.open_thread(thread_id)
+            messages = self._build_messages(message, conversation_history, thread_id)
+            
+            reply = self._dispatch_command(message)
+            if reply is not None:
+                messages.append(reply)
+                return {"messages": messages}
+            
+            # Invoke agent
+            logger.info(f"Invoking agent (async) with message: {message[:100]}...")
+            result = await self.agent_executor.ainvoke({"messages": messages})
+            self._save_thread(thread_id, result["messages"])
+            
+            logger.info("Agent invocation complete")
+            return result
+            
+        except Exception as e:
+            logger.error(f"Error invoking agent: {str(e)}", exc_info=True)
+            raise
+    
+    async def stream(self, message: str, conversation_history: Optional[List[Dict]] = None,
+                     thread_id: Optional[str] = None) -> AsyncIterator[Dict[str, Any]]:
         """
         Stream agent responses (async generator)
         
         Args:
             message: User message/question
             conversation_history: Optional list of previous messages
+            thread_id: Optional server-side thread (see invoke)
         
         Yields:
             Dictionary chunks with agent and tool outputs
@@ -188,30 +504,27 @@ class AgentService:
             self.initialize()
         
         try:
-            # Build message list
-            messages = []
-            
-            # Add system message if configured
-            if self.system_message:
-                messages.append(SystemMessage(content=self.system_message))
-            
-            # Add conversation history if provided
-            if conversation_history:
-                for msg in conversation_history:
-                    if msg.get("role") == "user":
-                        messages.append(HumanMessage(content=msg.get("content", "")))
-                    elif msg.get("role") == "assistant":
-                        messages.append(AIMessage(content=msg.get("content", "")))
+            thread_id = self.open_thread(thread_id)
+            messages = self._build_messages(message, conversation_history, thread_id)
             
-            # Add current message
-            messages.append(HumanMessage(content=message))
+            reply = self._dispatch_command(message)
+            if reply is not None:
+                yield {"agent": {"messages": [reply]}}
+                return
             
             # Stream agent responses
             logger.info(f"Streaming agent response for message: {message[:100]}...")
             
             async for chunk in self.agent_executor.astream({"messages": messages}):
+                if thread_id is not None:
+                    # Each chunk is {node: {"messages": [...new messages]}}
+                    for update in chunk.values():
+                        if isinstance(update, dict):
+                            messages.extend(update.get("messages", ()))
                 yield chunk
             
+            self._save_thread(thread_id, messages)
+            
             logger.info("Agent streaming complete")
             
         except Exception as e:
@@ -223,19 +536,12 @@ class AgentService:
         Get information about all available tools
         
         Returns:
-            List of tool information dictionaries
+            List of tool information dictionaries (shared; do not modify)
         """
         if not self.tools:
             self.initialize()
         
-        tools_info = []
-        for tool in self.tools:
-            tools_info.append({
-                "name": tool.name,
-                "description": tool.description
-            })
-        
-        return tools_info
+        return self._tools_info
     
     def is_ready(self) -> bool:
         """
@@ -253,13 +559,7 @@ class AgentService:
         Returns:
             Dictionary with status information
         """
-        return {
-            'initialized': self.is_ready(),
-            'model': settings.agent_model_name if self.llm else None,
-            'tools_count': len(self.tools),
-            'tools': [t.name for t in self.tools] if self.tools else [],
-            'system_message': self.system_message
-        }
+        return {'initialized': self.is_ready(), **self._static_info}
 
 
 # Singleton instance - export for easy access
@@ -3,18 +3,51 @@ FAISS Service for Agentic RAG API
 Singleton service for FAISS vector store initialization and retrieval
 """
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Optional, List
+import faiss
+import numpy as np
+from langchain.embeddings import CacheBackedEmbeddings
+from langchain.storage import LocalFileStore
+from langchain_core.embeddings import Embeddings
 from langchain_community.document_loaders import WebBaseLoader
 from langchain_community.vectorstores import FAISS
+from langchain_community.docstore.in_memory import InMemoryDocstore
 from langchain_openai import OpenAIEmbeddings
-from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain.tools.retriever import create_retriever_tool
 from config.settings import settings
 from config.logging_config import get_logger
+from utils.http_clients import get_http_client, get_async_http_client
+from utils.text_splitter import split_documents
 
 logger = get_logger(__name__)
 
+# Upper bound on concurrent URL fetches during initialization
+_MAX_LOAD_WORKERS = 16
+
+# Texts per embeddings request, and how many requests run at once;
+# keep workers x batch size within the OpenAI account's rate limits
+_EMBED_BATCH_SIZE = 256
+_MAX_EMBED_WORKERS = 8
+
+
+def _load_url(url: str):
+    """
+    Load documents from a single URL
+    
+    Args:
+        url: Web page to load
+        
+    Returns:
+        Tuple of (url, documents, error); error is None on success
+    """
+    try:
+        return url, WebBaseLoader(url).load(), None
+    except Exception as e:
+        return url, [], e
+
 
 class FAISSService:
     """
@@ -30,26 +63,38 @@ class FAISSService:
     
     _instance: Optional['FAISSService'] = None
     _initialized: bool = False
+    _lock = threading.Lock()
     
     def __new__(cls):
         """Singleton pattern: ensure only one instance exists"""
         if cls._instance is None:
-            cls._instance = super(FAISSService, cls).__new__(cls)
+            with cls._lock:
+                if cls._instance is None:
+                    cls._instance = super(FAISSService, cls).__new__(cls)
         return cls._instance
     
     def __init__(self):
         """Initialize FAISS service (only once)"""
-        if not FAISSService._initialized:
-            self.vectorstore: Optional[FAISS] = None
-            self.retriever = None
-            self.retriever_tool = None
-            self.embeddings = None
-            FAISSService._initialized = True
-            logger.info("FAISSService instance created")
+        if FAISSService._initialized:
+            return
+        with FAISSService._lock:
+            if not FAISSService._initialized:
+                self.vectorstore: Optional[FAISS] = None
+                self.retriever = None
+                self.retriever_tool = None
+                self.embeddings = None
+                self._init_lock = threading.Lock()
+                FAISSService._initialized = True
+                logger.info("FAISSService instance created")
     
     def initialize(self) -> bool:
         """
-        Initialize FAISS vector store from configured URLs
+        Initialize FAISS vector store, from the disk cache when present
+        
+        An existing cached index is always preferred over rebuilding from
+        the configured URLs; faiss_cache_enabled only controls writing the
+        cache. Safe to call from several threads; only one of them builds
+        the index.
         
         Returns:
             True if successful, False otherwise
@@ -58,6 +103,23 @@ class FAISSService:
             logger.info("FAISS vector store already initialized")
             return True
         
+        with self._init_lock:
+            # Another thread may have finished while this one waited
+            if self.vectorstore is not None:
+                return True
+            if settings.faiss_cache_path.exists():
+                if self._load_from_disk():
+                    return True
+                logger.info("Cache load failed, initializing from URLs...")
+            return self._initialize()
+    
+    def _initialize(self) -> bool:
+        """
+        Build the vector store from configured URLs (caller holds _init_lock)
+        
+        Returns:
+            True if successful, False otherwise
+        """
         try:
             logger.info("=" * 60)
             logger.info("FAISS INITIALIZATION")
@@ -74,18 +136,16 @@ class FAISSService:
             for i, url in enumerate(urls, 1):
                 logger.info(f"  {i}. {url}")
             
-            # Load documents from all URLs
+            # Load documents from all URLs concurrently (network-bound);
+            # results are collected in URL order so the index is deterministic
             all_docs = []
-            for url in urls:
-                try:
-                    logger.info(f"Loading: {url}")
-                    loader = WebBaseLoader(url)
-                    docs = loader.load()
+            with ThreadPoolExecutor(max_workers=min(len(urls), _MAX_LOAD_WORKERS)) as executor:
+                for url, docs, error in executor.map(_load_url, urls):
+                    if error is not None:
+                        logger.warning(f"  ✗ Failed to load {url}: {str(error)}")
+                        continue
                     all_docs.extend(docs)
-                    logger.info(f"  ✓ Loaded {len(docs)} document(s)")
-                except Exception as e:
-                    logger.warning(f"  ✗ Failed to load {url}: {str(e)}")
-                    continue
+                    logger.info(f"  ✓ Loaded {len(docs)} document(s) from {url}")
             
             if not all_docs:
                 logger.error("No documents loaded from any URL")
@@ -95,22 +155,38 @@ class FAISSService:
             
             # Split documents into chunks
             logger.info("Splitting documents into chunks...")
-            text_splitter = RecursiveCharacterTextSplitter(
+            documents = split_documents(
+                all_docs,
                 chunk_size=settings.faiss_chunk_size,
                 chunk_overlap=settings.faiss_chunk_overlap
             )
-            documents = text_splitter.split_documents(all_docs)
             logger.info(f"  ✓ Created {len(documents)} chunks")
             
             # Create embeddings
             logger.info("Initializing OpenAI embeddings...")
             self.embeddings = OpenAIEmbeddings(
-                openai_api_key=settings.openai_api_key
+                openai_api_key=settings.openai_api_key,
+                http_client=get_http_client(),
+                http_async_client=get_async_http_client()
             )
             
             # Create FAISS vector store
             logger.info("Creating FAISS vector store (this may take a moment)...")
-            self.vectorstore = FAISS.from_documents(documents, self.embeddings)
+            texts = [doc.page_content for doc in documents]
+            vectors = self._embed_texts(texts)
+            text_embeddings = list(zip(texts, vectors))
+            metadatas = [doc.metadata for doc in documents]
+            index = self._new_index(vectors)
+            if index is not None:
+                self.vectorstore = FAISS(self.embeddings, index, InMemoryDocstore(), {})
+                self.vectorstore.add_embeddings(text_embeddings, metadatas=metadatas)
+            else:
+                # Exact flat search; already fast for small corpora
+                self.vectorstore = FAISS.from_embeddings(
+                    text_embeddings=text_embeddings,
+                    embedding=self.embeddings,
+                    metadatas=metadatas
+                )
             logger.info("  ✓ FAISS vector store created")
             
             # Save to disk if caching is enabled
@@ -148,10 +224,107 @@ class FAISSService:
             logger.error(f"Error initializing FAISS: {str(e)}", exc_info=True)
             return False
     
+    def _new_index(self, vectors: List[List[float]]) -> Optional["faiss.Index"]:
+        """
+        Create the index for a corpus according to settings.faiss_index_type
+        
+        "auto" uses exact flat search below faiss_hnsw_min_chunks and HNSW
+        from there on. "hnsw_sq8" stores 8-bit scalar-quantized vectors in
+        the HNSW graph, a quarter of the float32 memory, at a small recall
+        cost.
+        
+        Args:
+            vectors: Embeddings of every chunk (quantizers train on them)
+            
+        Returns:
+            Empty index ready for add(), or None for the default flat index
+        """
+        index_type = settings.faiss_index_type
+        if index_type == "auto":
+            index_type = "hnsw" if len(vectors) >= settings.faiss_hnsw_min_chunks else "flat"
+        
+        if index_type == "flat":
+            return None
+        if index_type not in ("hnsw", "hnsw_sq8"):
+            raise ValueError(f"Unknown FAISS index type: {index_type}")
+        
+        # Large corpus: approximate HNSW search is sub-linear in N
+        logger.info(f"Using {index_type} index (M={settings.faiss_hnsw_m})")
+        index = self._new_hnsw_index(len(vectors[0]), quantized=index_type == "hnsw_sq8")
+        if not index.is_trained:
+            index.train(np.asarray(vectors, dtype=np.float32))
+        return index
+    
+    @staticmethod
+    def _new_hnsw_index(dimension: int, quantized: bool = False) -> "faiss.IndexHNSW":
+        """
+        Create an empty HNSW index for approximate L2 search
+        
+        Args:
+            dimension: Embedding vector size
+            quantized: Store 8-bit scalar-quantized vectors (needs training)
+            
+        Returns:
+            faiss.IndexHNSWFlat, or faiss.IndexHNSWSQ if quantized, tuned for
+            good recall
+        """
+        if quantized:
+            index = faiss.IndexHNSWSQ(dimension, faiss.ScalarQuantizer.QT_8bit, settings.faiss_hnsw_m)
+        else:
+            index = faiss.IndexHNSWFlat(dimension, settings.faiss_hnsw_m)
+        index.hnsw.efConstruction = 200
+        index.hnsw.efSearch = 64
+        return index
+    
+    def _embed_texts(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed texts in fixed-size batches, several requests at a time
+        
+        Args:
+            texts: Chunk texts to embed
+            
+        Returns:
+            Embedding vectors in the same order as texts
+        """
+        batches = [
+            texts[i:i + _EMBED_BATCH_SIZE]
+            for i in range(0, len(texts), _EMBED_BATCH_SIZE)
+        ]
+        workers = min(len(batches), _MAX_EMBED_WORKERS) or 1
+        logger.info(f"Embedding {len(texts)} chunks in {len(batches)} batch(es)...")
+        
+        embedder = self._document_embedder()
+        vectors: List[List[float]] = []
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for batch_vectors in executor.map(embedder.embed_documents, batches):
+                vectors.extend(batch_vectors)
+        return vectors
+    
+    def _document_embedder(self) -> Embeddings:
+        """
+        Embeddings for chunk texts, backed by the on-disk cache if enabled
+        
+        Cached vectors are keyed by a hash of the chunk text and namespaced
+        by model, so a rebuild (expired index cache, new URLs) only sends
+        new or changed chunks to the embeddings API.
+        
+        Returns:
+            Embeddings whose embed_documents skips already-embedded texts
+        """
+        if not settings.faiss_embedding_cache_enabled:
+            return self.embeddings
+        
+        store = LocalFileStore(str(settings.faiss_embedding_cache_dir))
+        return CacheBackedEmbeddings.from_bytes_store(
+            self.embeddings, store, namespace=self.embeddings.model
+        )
+    
     def load_from_disk(self) -> bool:
         """
         Load FAISS index from disk cache
         
+        Safe to call from several threads; only one of them loads the index.
+        
         Returns:
             True if successful, False otherwise
         """
@@ -159,6 +332,19 @@ class FAISSService:
             logger.info("FAISS vector store already initialized")
             return True
         
+        with self._init_lock:
+            # Another thread may have finished while this one waited
+            if self.vectorstore is not None:
+                return True
+            return self._load_from_disk()
+    
+    def _load_from_disk(self) -> bool:
+        """
+        Load the cached vector store (caller holds _init_lock)
+        
+        Returns:
+            True if successful, False otherwise
+        """
         try:
             cache_path = settings.faiss_cache_path
             
@@ -170,7 +356,9 @@ class FAISSService:
             
             # Initialize embeddings
             self.embeddings = OpenAIEmbeddings(
-                openai_api_key=settings.openai_api_key
+                openai_api_key=settings.openai_api_key,
+                http_client=get_http_client(),
+                http_async_client=get_async_http_client()
             )
             
             # Load FAISS index
@@ -206,14 +394,7 @@ class FAISSService:
             Retriever tool for LangChain agent
         """
         if self.retriever_tool is None:
-            # Try to load from cache first
-            if settings.faiss_cache_enabled:
-                success = self.load_from_disk()
-                if not success:
-                    logger.info("Cache load failed, initializing from URLs...")
-                    self.initialize()
-            else:
-                self.initialize()
+            self.initialize()
         
         return self.retriever_tool
     
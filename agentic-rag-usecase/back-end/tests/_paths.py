@@ -0,0 +1,11 @@
+"""
+Test Paths
+Back-end locations shared by the test modules
+"""
+from pathlib import Path
+
+# Back-end root (the directory holding main.py)
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+# Local environment file, loaded once per session by conftest.py
+ENV_FILE = PROJECT_ROOT / ".env"
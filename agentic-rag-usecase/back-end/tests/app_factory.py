@@ -0,0 +1,27 @@
+"""
+Test App Factory
+Cached FastAPI app instances keyed by settings overrides
+"""
+from functools import lru_cache
+from fastapi import FastAPI
+
+
+@lru_cache(maxsize=None)
+def get_app(config_key: frozenset = frozenset()) -> FastAPI:
+    """
+    Get the app for a set of settings overrides, building it once
+    
+    Args:
+        config_key: frozenset of (setting name, value) pairs; empty for
+                    the default app
+    
+    Returns:
+        FastAPI app shared by every test that uses the same overrides
+    """
+    if not config_key:
+        # The default app is the one main builds at import time
+        from main import app
+        return app
+    
+    from main import create_app
+    return create_app(dict(config_key))
@@ -0,0 +1,295 @@
+"""
+Shared Test Fixtures
+Session-wide setup used by the test modules
+"""
+import pytest
+import sys
+from dotenv import load_dotenv
+from tests._paths import PROJECT_ROOT, ENV_FILE
+
+# Add parent directory to path
+sys.path.insert(0, str(PROJECT_ROOT))
+
+# Load environment variables from .env file, once for every test module
+load_dotenv(dotenv_path=ENV_FILE)
+
+
+# Reply of the stand-in chat model used unless --run-slow is given
+FAKE_LLM_REPLY = "This is a canned test response."
+
+
+def pytest_addoption(parser):
+    """Add --run-slow to opt in to tests that call the real LLM"""
+    parser.addoption(
+        "--run-slow", action="store_true", default=False,
+        help="run tests marked slow, using the real OpenAI chat model"
+    )
+
+
+def pytest_configure(config):
+    """Register custom markers"""
+    config.addinivalue_line("markers", "slow: needs the real OpenAI chat model (run with --run-slow)")
+    config.addinivalue_line("markers", "integration: exercises the full agent stack (deselected by default, run with -m integration)")
+
+
+def pytest_collection_modifyitems(config, items):
+    """Skip slow tests unless --run-slow is given"""
+    if config.getoption("--run-slow"):
+        return
+    skip_slow = pytest.mark.skip(reason="calls the real LLM; use --run-slow")
+    for item in items:
+        if "slow" in item.keywords:
+            item.add_marker(skip_slow)
+
+
+def _memory_engine_options() -> dict:
+    """Engine options for an in-memory SQLite database shared across threads"""
+    from sqlalchemy.pool import StaticPool
+    
+    # StaticPool keeps one connection, so TestClient's worker threads all
+    # see the same in-memory database
+    return {"poolclass": StaticPool, "connect_args": {"check_same_thread": False}}
+
+
+@pytest.fixture(scope="session")
+def in_memory_databases():
+    """
+    Serve the CRM and Chinook databases from in-memory SQLite
+    
+    The shared lazy instances used by the CRM and SQL tools are replaced
+    with in-memory copies, and database initialization (also run by app
+    startup) is skipped, so tests never touch the on-disk files.
+    """
+    import sqlite3
+    from sqlalchemy import create_engine
+    from langchain_community.utilities import SQLDatabase
+    import db.init_databases as init_databases
+    import tools.crm_tools as crm_tools
+    import tools.sql_tools as sql_tools
+    from db.manager import CustomerManager
+    
+    # CRM: schema plus a small generated sample
+    manager = CustomerManager("sqlite://", **_memory_engine_options())
+    manager.bulk_create_customers(init_databases.generate_customers(10))
+    
+    # Chinook: copy the seeded file into memory with SQLite's backup API
+    chinook_db = None
+    source = init_databases.find_chinook_source()
+    if source is not None:
+        engine = create_engine("sqlite://", **_memory_engine_options())
+        with sqlite3.connect(source) as source_conn:
+            source_conn.backup(engine.raw_connection().driver_connection)
+        chinook_db = SQLDatabase(engine)
+    
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setattr(crm_tools, "_customer_manager", manager)
+        if chinook_db is not None:
+            monkeypatch.setattr(sql_tools, "_db", chinook_db)
+        monkeypatch.setattr(
+            init_databases, "initialize_databases",
+            lambda *args, **kwargs: {"crm": True, "chinook": chinook_db is not None}
+        )
+        yield
+
+
+@pytest.fixture(scope="session")
+def database_paths(tmp_path_factory):
+    """
+    Point the CRM and Chinook database paths at a temporary directory
+    
+    For tests that run the real database setup: files (and the
+    initialization sentinel) are written there instead of to db/.
+    
+    Returns:
+        Directory holding the test databases
+    """
+    from config.settings import settings
+    
+    db_dir = tmp_path_factory.mktemp("db")
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        # Both paths are cached properties, read from the instance __dict__
+        monkeypatch.setitem(settings.__dict__, "crm_database_full_path", db_dir / "crm.db")
+        monkeypatch.setitem(settings.__dict__, "chinook_database_full_path", db_dir / "chinook.db")
+        yield db_dir
+
+
+@pytest.fixture(scope="session")
+def fake_llm(request):
+    """
+    Build the agent on a deterministic stand-in chat model
+    
+    Every agent turn answers FAKE_LLM_REPLY without tool calls, so chat
+    tests need no network and finish in milliseconds. With --run-slow the
+    real model is kept.
+    """
+    if request.config.getoption("--run-slow"):
+        yield
+        return
+    
+    import importlib
+    import itertools
+    from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+    
+    class FakeChatModel(GenericFakeChatModel):
+        """GenericFakeChatModel that accepts (and ignores) bound tools"""
+        
+        def bind_tools(self, tools, **kwargs):
+            return self
+    
+    # services/__init__ rebinds the attribute to the instance, so import the
+    # module by name to patch its ChatOpenAI reference
+    agent_module = importlib.import_module("services.agent_service")
+    agent = agent_module.agent_service
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setattr(
+            agent_module, "ChatOpenAI",
+            lambda **kwargs: FakeChatModel(messages=itertools.repeat(FAKE_LLM_REPLY))
+        )
+        # Rebuild even if an earlier test already initialized the real agent;
+        # the previous executor is restored on teardown
+        monkeypatch.setattr(agent, "agent_executor", None)
+        monkeypatch.setattr(agent, "llm", None)
+        yield
+
+
+# Documents served by the stand-in retriever used unless --run-slow is given
+FAKE_FAISS_DOCS = (
+    "LangSmith is a platform for tracing and evaluating LLM applications.",
+    "LangSmith datasets store examples used to evaluate chains and agents.",
+)
+
+
+@pytest.fixture(scope="session")
+def fake_faiss(request):
+    """
+    Serve the retriever tool from a small in-memory vector store
+    
+    The FAISS service is given a precomputed store over FAKE_FAISS_DOCS
+    with deterministic fake embeddings, so neither the documentation URLs
+    nor the embeddings API are called. With --run-slow the real index is
+    built (or loaded from cache) instead.
+    """
+    if request.config.getoption("--run-slow"):
+        yield
+        return
+    
+    from langchain.tools.retriever import create_retriever_tool
+    from langchain_core.embeddings import DeterministicFakeEmbedding
+    from langchain_core.vectorstores import InMemoryVectorStore
+    from config.settings import settings
+    from services.faiss_service import faiss_service
+    
+    vectorstore = InMemoryVectorStore.from_texts(
+        list(FAKE_FAISS_DOCS), DeterministicFakeEmbedding(size=16)
+    )
+    retriever = vectorstore.as_retriever()
+    retriever_tool = create_retriever_tool(
+        retriever, settings.faiss_tool_name, settings.faiss_tool_description
+    )
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setattr(faiss_service, "vectorstore", vectorstore)
+        monkeypatch.setattr(faiss_service, "retriever", retriever)
+        monkeypatch.setattr(faiss_service, "retriever_tool", retriever_tool)
+        yield
+
+
+@pytest.fixture(scope="session")
+def faiss_svc(fake_faiss):
+    """
+    FAISS service, initialized at most once per session
+    
+    Returns:
+        The shared FAISS service (the in-memory stand-in unless --run-slow)
+    """
+    from services.faiss_service import faiss_service
+    
+    # Initialize FAISS service (may fail gracefully)
+    if not faiss_service.is_ready():
+        try:
+            faiss_service.initialize()
+        except Exception:
+            pass  # OK if FAISS initialization fails in tests
+    
+    return faiss_service
+
+
+@pytest.fixture(scope="session")
+def setup_services(in_memory_databases, faiss_svc, fake_llm):
+    """
+    Setup all services once for the whole test session
+    
+    The services are process-wide singletons, so anything already
+    initialized (e.g. by app startup) is not built again.
+    """
+    from services.agent_service import agent_service
+    
+    # Initialize agent service
+    if not agent_service.is_ready():
+        success = agent_service.initialize()
+        assert success, "Agent service initialization failed"
+    
+    yield
+
+
+@pytest.fixture(scope="session")
+def agent_svc(setup_services):
+    """
+    Agent service, built once per session on the test databases and models
+    
+    Returns:
+        The shared, initialized agent service
+    """
+    from services.agent_service import agent_service
+    return agent_service
+
+
+@pytest.fixture(scope="session")
+def app():
+    """
+    Default FastAPI app, shared by the whole session
+    
+    Returns:
+        The app main builds at import time
+    """
+    from tests.app_factory import get_app
+    return get_app()
+
+
+@pytest.fixture
+def post_chat(client):
+    """
+    POST a chat request through the test module's client
+    
+    Returns:
+        Callable taking the message, optional conversation history and any
+        extra request fields, returning the response
+    """
+    def _post(message, conversation_history=(), **fields):
+        payload = {"message": message, "conversation_history": list(conversation_history), **fields}
+        return client.post("/chat", json=payload)
+    
+    return _post
+
+
+@pytest.fixture(scope="session")
+def anyio_backend():
+    """Run anyio-marked tests on asyncio, sharing one backend runner per session"""
+    return "asyncio"
+
+
+@pytest.fixture(scope="session")
+async def async_client():
+    """
+    Async HTTP client calling the app in-process over ASGI
+    
+    Unlike TestClient, requests run on the session's event loop without a
+    thread hop, and responses can be consumed as they stream, so SSE
+    endpoints run exactly as in production. One client (and its connection
+    pool) is shared by the whole session.
+    """
+    import httpx
+    from tests.app_factory import get_app
+    
+    transport = httpx.ASGITransport(app=get_app())
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        yield client
@@ -3,215 +3,213 @@ API Endpoint Tests with Mocking
 Tests each API endpoint with mocked services
 """
 import pytest
-import sys
-from pathlib import Path
-from unittest.mock import Mock, patch, AsyncMock
+from unittest.mock import Mock, patch
 from datetime import datetime
 
-# Add parent directory to path
-project_root = Path(__file__).parent.parent
-sys.path.insert(0, str(project_root))
-
 from fastapi.testclient import TestClient
 from fastapi import status
-from main import app
-from api.models import ChatRequest, ChatResponse
+from tests.app_factory import get_app
+from api.models import (
+    ChatRequest, ChatResponse, HealthResponse, ToolsResponse, StreamEvent, StreamEventType
+)
+from api.dependencies import get_agent_service, get_faiss_service, get_customer_manager
 from langchain_core.messages import HumanMessage, AIMessage
+from services.agent_service import AgentService
+from services.faiss_service import FAISSService
+from db.manager import CustomerManager
+from utils.helpers import format_timestamp, sanitize_message, validate_conversation_history
 
+app = get_app()
 
-@pytest.fixture
+# Shared request payloads and canned mock results (never mutated by tests)
+EMPTY_HISTORY_REQUEST = {"message": "Hello AI", "conversation_history": []}
+HISTORY_REQUEST = {
+    "message": "Follow-up question",
+    "conversation_history": [
+        {"role": "user", "content": "First question"},
+        {"role": "assistant", "content": "First answer"}
+    ]
+}
+MOCK_AGENT_RESULT = {
+    "messages": [
+        HumanMessage(content="Test question"),
+        AIMessage(content="Test answer")
+    ]
+}
+MOCK_TOOLS_3 = tuple(
+    {"name": f"tool{i}", "description": f"Tool {i}"} for i in range(1, 4)
+)
+
+
+@pytest.fixture(scope="module")
 def client():
-    """Create test client"""
+    """
+    Create one test client for the module
+    
+    The lifespan is not entered: every service used here is mocked, so
+    building the real databases, FAISS index and agent would be wasted work.
+    """
     return TestClient(app)
 
 
+@pytest.fixture(autouse=True)
+def reset_dependency_overrides():
+    """Clear dependency overrides so tests sharing the client stay isolated"""
+    yield
+    app.dependency_overrides.clear()
+
+
+async def _mock_stream(*args, **kwargs):
+    """Stand-in for AgentService.stream: one agent step, like a direct answer"""
+    yield {"agent": {"messages": [AIMessage(content="Test answer")]}}
+
+
 @pytest.fixture
 def mock_agent_service():
     """Mock agent service for testing"""
-    with patch('api.routes.AgentServiceDep') as mock:
-        service = Mock()
-        service.invoke.return_value = [
-            HumanMessage(content="Test question"),
-            AIMessage(content="Test answer")
-        ]
-        service.stream = AsyncMock(return_value=None)
-        service.get_tools_info.return_value = [
-            {"name": "test_tool", "description": "Test tool"}
-        ]
-        mock.return_value = service
-        yield service
+    service = Mock(spec=AgentService)
+    service.tools = []
+    service.is_ready.return_value = True
+    service.get_info.return_value = {"model": "test-model", "tools_count": 1}
+    # spec= makes ainvoke an AsyncMock already
+    service.ainvoke.return_value = MOCK_AGENT_RESULT
+    service.stream = _mock_stream
+    service.get_tools_info.return_value = [
+        {"name": "test_tool", "description": "Test tool"}
+    ]
+    app.dependency_overrides[get_agent_service] = lambda: service
+    yield service
+    app.dependency_overrides.pop(get_agent_service, None)
 
 
 @pytest.fixture
 def mock_faiss_service():
     """Mock FAISS service for testing"""
-    with patch('api.routes.FAISSServiceDep') as mock:
-        service = Mock()
-        service.is_initialized.return_value = True
-        mock.return_value = service
-        yield service
+    service = Mock(spec=FAISSService)
+    service.is_ready.return_value = True
+    service.get_info.return_value = {"tool_name": "test_retriever", "cache_enabled": False}
+    app.dependency_overrides[get_faiss_service] = lambda: service
+    yield service
+    app.dependency_overrides.pop(get_faiss_service, None)
 
 
 @pytest.fixture
 def mock_customer_manager():
     """Mock customer manager for testing"""
-    with patch('api.routes.CustomerManagerDep') as mock:
-        manager = Mock()
-        manager.session = Mock()
-        manager.session.is_active = True
-        mock.return_value = manager
-        yield manager
+    manager = Mock(spec=CustomerManager)
+    manager.get_customer_count.return_value = 10
+    app.dependency_overrides[get_customer_manager] = lambda: manager
+    yield manager
+    app.dependency_overrides.pop(get_customer_manager, None)
 
 
 class TestChatEndpointMocked:
     """Test /chat endpoint with mocked services"""
     
-    def test_chat_success(self, client, mock_agent_service):
-        """Test successful chat request"""
-        request_data = {
-            "message": "Hello AI",
-            "conversation_history": []
-        }
-        
-        response = client.post("/chat", json=request_data)
-        
-        assert response.status_code == 200
+    @pytest.mark.parametrize("payload, side_effect, expected_status", [
+        pytest.param(EMPTY_HISTORY_REQUEST, None, 200, id="success"),
+        pytest.param(HISTORY_REQUEST, None, 200, id="with-history"),
+        pytest.param(EMPTY_HISTORY_REQUEST, Exception("Agent failed"), 500, id="agent-error"),
+    ])
+    def test_chat(self, post_chat, mock_agent_service, payload, side_effect, expected_status):
+        """Test chat requests, including agent failures"""
+        mock_agent_service.ainvoke.side_effect = side_effect
+        
+        response = post_chat(**payload)
+        
+        assert response.status_code == expected_status
         data = response.json()
-        
-        # Verify response structure
-        assert "response" in data
-        assert "conversation_history" in data
-        assert "timestamp" in data
-        
-        # Verify agent was called
-        mock_agent_service.invoke.assert_called_once()
+        mock_agent_service.ainvoke.assert_awaited_once()
+        
+        if expected_status == 200:
+            # Verify response structure
+            parsed = ChatResponse.model_validate(data)
+            assert parsed.message == "Test answer"
+        else:
+            assert "error" in data
     
-    def test_chat_with_history(self, client, mock_agent_service):
-        """Test chat with conversation history"""
-        request_data = {
-            "message": "Follow-up question",
-            "conversation_history": [
-                {"role": "user", "content": "First question"},
-                {"role": "assistant", "content": "First answer"}
-            ]
-        }
+    def test_chat_thread_id_issued_by_server(self, post_chat, mock_agent_service):
+        """Test the agent gets, and the response returns, the server-issued thread id"""
+        mock_agent_service.open_thread.return_value = "issued-id"
         
-        response = client.post("/chat", json=request_data)
+        response = post_chat("Hi", thread_id="t-1")
         
         assert response.status_code == 200
-        mock_agent_service.invoke.assert_called_once()
-    
-    def test_chat_missing_message(self, client):
-        """Test chat with missing message field"""
-        request_data = {
-            "conversation_history": []
-        }
-        
-        response = client.post("/chat", json=request_data)
-        
-        assert response.status_code == 422
-        data = response.json()
-        assert "error" in data or "detail" in data
-    
-    def test_chat_invalid_history_format(self, client):
-        """Test chat with invalid conversation history format"""
-        request_data = {
-            "message": "Test",
-            "conversation_history": "invalid"  # Should be list
-        }
-        
-        response = client.post("/chat", json=request_data)
-        
-        assert response.status_code == 422
-    
-    def test_chat_agent_error(self, client, mock_agent_service):
-        """Test chat when agent service fails"""
-        mock_agent_service.invoke.side_effect = Exception("Agent failed")
-        
-        request_data = {
-            "message": "Test",
-            "conversation_history": []
-        }
-        
-        response = client.post("/chat", json=request_data)
-        
-        # Should return 500 error
-        assert response.status_code == 500
-        data = response.json()
-        assert "error" in data
+        mock_agent_service.open_thread.assert_called_once_with("t-1")
+        assert mock_agent_service.ainvoke.await_args.kwargs["thread_id"] == "issued-id"
+        assert ChatResponse.model_validate(response.json()).thread_id == "issued-id"
 
 
 class TestStreamingChatMocked:
     """Test /chat-stream endpoint with mocked services"""
     
-    @pytest.mark.asyncio
-    async def test_stream_success(self, client, mock_agent_service):
+    @pytest.mark.anyio
+    async def test_stream_success(self, async_client, mock_agent_service):
         """Test successful streaming chat"""
-        # Mock streaming generator
+        async with async_client.stream("POST", "/chat-stream", json=EMPTY_HISTORY_REQUEST) as response:
+            assert response.status_code == 200
+            assert "text/event-stream" in response.headers.get("content-type", "")
+            
+            # Stop reading as soon as the first event arrives
+            first_event = None
+            async for line in response.aiter_lines():
+                if line.startswith("data: "):
+                    first_event = StreamEvent.model_validate_json(line[len("data: "):])
+                    break
+        
+        assert first_event is not None
+        assert first_event.event == StreamEventType.START
+    
+    def test_stream_events_match_schema(self, client, mock_agent_service):
+        """Test streamed frames conform to StreamEvent without per-frame validation"""
         async def mock_stream(*args, **kwargs):
-            yield {"agent": {"messages": [{"type": "ai", "content": "chunk1"}]}}
-            yield {"agent": {"messages": [{"type": "ai", "content": "chunk2"}]}}
+            yield {"agent": {"messages": [AIMessage(content="chunk1")]}}
+            yield {"tools": {"messages": []}}
         
         mock_agent_service.stream = mock_stream
         
-        request_data = {
-            "message": "Stream test",
-            "conversation_history": []
-        }
-        
-        response = client.post("/chat-stream", json=request_data)
-        
-        assert response.status_code == 200
-        assert "text/event-stream" in response.headers.get("content-type", "")
-    
-    def test_stream_missing_message(self, client):
-        """Test streaming with missing message"""
-        request_data = {
-            "conversation_history": []
-        }
-        
-        response = client.post("/chat-stream", json=request_data)
+        with client.stream("POST", "/chat-stream", json=EMPTY_HISTORY_REQUEST) as response:
+            assert response.status_code == 200
+            events = [
+                StreamEvent.model_validate_json(line[len("data: "):])
+                for line in response.iter_lines()
+                if line.startswith("data: ")
+            ]
         
-        assert response.status_code == 422
+        assert [event.event for event in events] == [
+            StreamEventType.START,
+            StreamEventType.AGENT,
+            StreamEventType.TOOL,
+            StreamEventType.END
+        ]
 
 
 class TestHealthEndpointMocked:
     """Test /health endpoint with mocked services"""
     
-    def test_health_all_healthy(self, client, mock_agent_service, mock_faiss_service, mock_customer_manager):
-        """Test health check when all services are healthy"""
-        mock_agent_service.is_initialized.return_value = True
-        
-        response = client.get("/health")
-        
-        assert response.status_code == 200
-        data = response.json()
-        
-        assert data["status"] == "healthy"
-        assert "components" in data
-        assert "timestamp" in data
-    
-    def test_health_agent_unhealthy(self, client, mock_agent_service, mock_customer_manager):
-        """Test health check when agent service is down"""
-        mock_agent_service.is_initialized.return_value = False
+    @pytest.mark.parametrize(
+        "agent_ready, db_ok, expected_code, expected_status, failed_component", [
+            pytest.param(True, True, 200, "healthy", None, id="all-healthy"),
+            pytest.param(False, True, 200, "degraded", "agent", id="agent-down"),
+            pytest.param(True, False, 200, "unhealthy", "database", id="database-error"),
+        ]
+    )
+    def test_health(self, client, mock_agent_service, mock_faiss_service, mock_customer_manager,
+                    agent_ready, db_ok, expected_code, expected_status, failed_component):
+        """Test health check with healthy and failing components"""
+        mock_agent_service.is_ready.return_value = agent_ready
+        if not db_ok:
+            mock_customer_manager.get_customer_count.side_effect = Exception("database is locked")
         
         response = client.get("/health")
         
-        assert response.status_code == 503  # Service Unavailable
-        data = response.json()
-        
-        assert data["status"] == "unhealthy"
-        assert data["components"]["agent_service"]["status"] == "unhealthy"
-    
-    def test_health_database_error(self, client, mock_agent_service, mock_customer_manager):
-        """Test health check when database has issues"""
-        mock_agent_service.is_initialized.return_value = True
-        mock_customer_manager.session.is_active = False
+        assert response.status_code == expected_code
+        parsed = HealthResponse.model_validate(response.json())
         
-        response = client.get("/health")
-        
-        # Should still return but indicate database issue
-        assert response.status_code in [200, 503]
+        assert parsed.status == expected_status
+        assert parsed.timestamp
+        if failed_component is not None:
+            assert parsed.components[failed_component].status == "unhealthy"
 
 
 class TestToolsEndpointMocked:
@@ -219,31 +217,28 @@ class TestToolsEndpointMocked:
     
     def test_get_tools_success(self, client, mock_agent_service):
         """Test getting tools list"""
-        mock_tools = [
-            {"name": "tool1", "description": "Tool 1"},
-            {"name": "tool2", "description": "Tool 2"},
-            {"name": "tool3", "description": "Tool 3"}
-        ]
-        mock_agent_service.get_tools_info.return_value = mock_tools
+        mock_agent_service.get_tools_info.return_value = list(MOCK_TOOLS_3)
         
         response = client.get("/tools")
         
         assert response.status_code == 200
-        data = response.json()
+        parsed = ToolsResponse.model_validate(response.json())
         
-        assert "tools" in data
-        assert "count" in data
-        assert data["count"] == 3
-        assert len(data["tools"]) == 3
+        assert parsed.total == 3
+        assert len(parsed.tools) == 3
     
     def test_get_tools_agent_not_initialized(self, client, mock_agent_service):
         """Test getting tools when agent is not initialized"""
-        mock_agent_service.is_initialized.return_value = False
+        mock_agent_service.is_ready.return_value = False
+        
+        mock_agent_service.tools = []
+        mock_agent_service.get_tools_info.return_value = []
         
         response = client.get("/tools")
         
-        # Should return error or empty list
-        assert response.status_code in [200, 503]
+        # Lists whatever tools exist, so an uninitialized agent yields none
+        assert response.status_code == 200
+        assert response.json()["tools"] == []
 
 
 class TestRootEndpoint:
@@ -260,6 +255,15 @@ class TestRootEndpoint:
         assert "version" in data
         assert "docs" in data
         assert "health" in data
+    
+    def test_openapi_schema(self, client):
+        """Test OpenAPI generation with forward-referenced dependency types"""
+        response = client.get("/openapi.json")
+        
+        assert response.status_code == 200
+        paths = response.json()["paths"]
+        
+        assert {"/chat", "/chat-stream", "/health", "/tools"} <= set(paths)
 
 
 class TestErrorHandlers:
@@ -300,28 +304,33 @@ class TestErrorHandlers:
 class TestRequestValidation:
     """Test request validation"""
     
-    def test_empty_json_body(self, client):
-        """Test endpoint with empty JSON body"""
-        response = client.post("/chat", json={})
-        
-        assert response.status_code == 422
-    
-    def test_malformed_json(self, client):
-        """Test endpoint with malformed JSON"""
-        response = client.post(
-            "/chat",
-            data="not valid json",
-            headers={"Content-Type": "application/json"}
-        )
+    @pytest.mark.parametrize("path, payload, kwargs", [
+        pytest.param("/chat", {"conversation_history": []}, {}, id="missing-message"),
+        pytest.param(
+            "/chat", {"message": "Test", "conversation_history": "invalid"}, {},
+            id="history-not-a-list"
+        ),
+        pytest.param("/chat", {}, {}, id="empty-body"),
+        pytest.param(
+            "/chat", None,
+            {"content": "not valid json", "headers": {"Content-Type": "application/json"}},
+            id="malformed-json"
+        ),
+        pytest.param("/chat-stream", {"conversation_history": []}, {}, id="stream-missing-message"),
+    ])
+    def test_invalid_chat_request(self, client, path, payload, kwargs):
+        """Test invalid chat requests are rejected with a validation error"""
+        response = client.post(path, json=payload, **kwargs)
         
         assert response.status_code == 422
+        data = response.json()
+        assert "error" in data or "detail" in data
     
-    def test_missing_content_type(self, client):
-        """Test POST without content-type"""
-        response = client.post("/chat", data='{"message": "test"}')
+    def test_missing_content_type(self, client, mock_agent_service):
+        """Test POST without content-type is still parsed as JSON"""
+        response = client.post("/chat", content='{"message": "test"}')
         
-        # Should either work or return validation error
-        assert response.status_code in [200, 422]
+        assert response.status_code == 200
 
 
 class TestUtilityFunctions:
@@ -329,8 +338,6 @@ class TestUtilityFunctions:
     
     def test_timestamp_format(self):
         """Test timestamp formatting in responses"""
-        from utils.helpers import format_timestamp
-        
         timestamp = format_timestamp()
         
         # Should be ISO format
@@ -339,8 +346,6 @@ class TestUtilityFunctions:
     
     def test_message_sanitization(self):
         """Test message sanitization"""
-        from utils.helpers import sanitize_message
-        
         # Test normal message
         result = sanitize_message("Hello world")
         assert result == "Hello world"
@@ -350,28 +355,18 @@ class TestUtilityFunctions:
         assert "Line 1" in result
         assert "Line 2" in result
     
-    def test_conversation_history_validation(self):
+    @pytest.mark.parametrize("history, expected_valid", [
+        pytest.param(
+            [{"role": "user", "content": "Hello"}, {"role": "assistant", "content": "Hi"}],
+            True,
+            id="valid"
+        ),
+        pytest.param([{"content": "Hello"}], False, id="missing-role"),
+        pytest.param([{"role": "user", "content": 123}], False, id="wrong-type"),
+    ])
+    def test_conversation_history_validation(self, history, expected_valid):
         """Test conversation history validation"""
-        from utils.helpers import validate_conversation_history
-        
-        # Valid history
-        valid_history = [
-            {"role": "user", "content": "Hello"},
-            {"role": "assistant", "content": "Hi"}
-        ]
-        
-        is_valid, error = validate_conversation_history(valid_history)
-        assert is_valid is True
-        assert error is None
-        
-        # Invalid history - missing role
-        invalid_history = [
-            {"content": "Hello"}
-        ]
-        
-        is_valid, error = validate_conversation_history(invalid_history)
-        assert is_valid is False
-        assert error is not None
+        assert validate_conversation_history(history) is expected_valid
 
 
 if __name__ == "__main__":
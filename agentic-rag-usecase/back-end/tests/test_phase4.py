@@ -2,19 +2,16 @@
 Phase 4 Validation Tests
 Validates error handling, middleware, and utility functions
 """
+import asyncio
 import pytest
-import sys
-from pathlib import Path
 from datetime import datetime
 from unittest.mock import Mock, patch
 import json
 
-# Add parent directory to path
-project_root = Path(__file__).parent.parent
-sys.path.insert(0, str(project_root))
+# Back-end root, for file existence checks (sys.path is set in conftest.py)
+from tests._paths import PROJECT_ROOT
 
 from fastapi import Request, status
-from fastapi.testclient import TestClient
 from starlette.exceptions import HTTPException as StarletteHTTPException
 from fastapi.exceptions import RequestValidationError
 
@@ -37,13 +34,6 @@ from utils.helpers import (
     safe_json_dumps,
     format_error_response
 )
-from main import app
-
-
-@pytest.fixture
-def client():
-    """Create test client"""
-    return TestClient(app)
 
 
 class TestUtilityFunctions:
@@ -236,7 +226,7 @@ class TestUtilityFunctions:
 class TestExceptionHandlers:
     """Test custom exception handlers"""
     
-    @pytest.mark.asyncio
+    @pytest.mark.anyio
     async def test_http_exception_handler(self):
         """Test HTTP exception handler"""
         request = Mock(spec=Request)
@@ -253,7 +243,7 @@ class TestExceptionHandlers:
         assert "detail" in body
         assert body["detail"] == "Not found"
     
-    @pytest.mark.asyncio
+    @pytest.mark.anyio
     async def test_validation_exception_handler(self):
         """Test validation exception handler"""
         request = Mock(spec=Request)
@@ -278,7 +268,7 @@ class TestExceptionHandlers:
         assert "error" in body
         assert body["error"] == "ValidationError"
     
-    @pytest.mark.asyncio
+    @pytest.mark.anyio
     async def test_general_exception_handler(self):
         """Test general exception handler"""
         request = Mock(spec=Request)
@@ -298,36 +288,36 @@ class TestExceptionHandlers:
 class TestErrorHandlingIntegration:
     """Test error handling in real API requests"""
     
-    def test_validation_error_real_request(self, client):
-        """Test validation error with real request"""
-        response = client.post("/chat", json={"invalid": "data"})
-        
-        assert response.status_code == 422
-        data = response.json()
-        assert "error" in data or "detail" in data
-    
-    def test_not_found_error(self, client):
-        """Test 404 error handling"""
-        response = client.get("/nonexistent")
-        
-        assert response.status_code == 404
-        data = response.json()
-        assert "error" in data or "detail" in data
-    
-    def test_method_not_allowed_error(self, client):
-        """Test 405 error handling"""
-        response = client.delete("/health")  # Only GET allowed
-        
-        assert response.status_code == 405
+    # (method, path, JSON body, expected status) for requests that must fail
+    ERROR_REQUESTS = (
+        ("POST", "/chat", {"invalid": "data"}, 422),
+        ("POST", "/chat", {}, 422),
+        ("GET", "/nonexistent", None, 404),
+        ("DELETE", "/health", None, 405),  # Only GET allowed
+    )
+    
+    @pytest.mark.anyio
+    async def test_error_matrix(self, async_client):
+        """Test validation, 404 and 405 errors share one response format"""
+        responses = await asyncio.gather(*(
+            async_client.request(method, path, json=body)
+            for method, path, body, _ in self.ERROR_REQUESTS
+        ))
+        
+        for (method, path, _, expected), response in zip(self.ERROR_REQUESTS, responses):
+            assert response.status_code == expected, f"{method} {path}"
+            data = response.json()
+            assert "error" in data or "detail" in data, f"{method} {path}"
 
 
 class TestMiddleware:
     """Test custom middleware"""
     
-    def test_request_logging_middleware(self, client):
+    @pytest.mark.anyio
+    async def test_request_logging_middleware(self, async_client):
         """Test that request logging middleware logs requests"""
         # Make a request
-        response = client.get("/health")
+        response = await async_client.get("/health")
         
         # Request should be processed normally
         assert response.status_code == 200
@@ -342,58 +332,37 @@ class TestPhase4FilesExist:
     
     def test_helpers_file_exists(self):
         """Test utils/helpers.py exists"""
-        helpers_path = project_root / "utils" / "helpers.py"
+        helpers_path = PROJECT_ROOT / "utils" / "helpers.py"
         assert helpers_path.exists(), "utils/helpers.py does not exist"
     
     def test_middleware_file_exists(self):
         """Test api/middleware.py exists"""
-        middleware_path = project_root / "api" / "middleware.py"
+        middleware_path = PROJECT_ROOT / "api" / "middleware.py"
         assert middleware_path.exists(), "api/middleware.py does not exist"
     
     def test_integration_tests_exist(self):
         """Test integration tests file exists"""
-        tests_path = project_root / "tests" / "test_integration.py"
+        tests_path = PROJECT_ROOT / "tests" / "test_integration.py"
         assert tests_path.exists(), "tests/test_integration.py does not exist"
     
     def test_api_tests_exist(self):
         """Test API tests file exists"""
-        tests_path = project_root / "tests" / "test_api.py"
+        tests_path = PROJECT_ROOT / "tests" / "test_api.py"
         assert tests_path.exists(), "tests/test_api.py does not exist"
 
 
 class TestPhase4Functionality:
     """Test that Phase 4 functionality is integrated"""
     
-    def test_exception_handlers_registered(self):
+    def test_exception_handlers_registered(self, app):
         """Test that exception handlers are registered"""
-        from main import app
-        
         # App should have exception handlers
         assert len(app.exception_handlers) > 0
     
-    def test_middleware_registered(self):
+    def test_middleware_registered(self, app):
         """Test that middleware is registered"""
-        from main import app
-        
         # App should have middleware
         assert len(app.user_middleware) > 0
-    
-    def test_error_response_format_consistent(self, client):
-        """Test that error responses use consistent format"""
-        # Test multiple error types
-        errors = []
-        
-        # Validation error
-        response = client.post("/chat", json={})
-        errors.append(response.json())
-        
-        # 404 error
-        response = client.get("/nonexistent")
-        errors.append(response.json())
-        
-        # All should have consistent structure
-        for error in errors:
-            assert "error" in error or "detail" in error
 
 
 if __name__ == "__main__":
@@ -1,16 +1,45 @@
 """
 Tools package for Agentic RAG API
 Provides search, CRM, and SQL query tools
+
+Getters are imported from their submodule on first access, so e.g.
+`from tools import get_sql_tool` does not load the search tool wrappers.
 """
-from .search_tools import get_all_search_tools, get_wikipedia_tool, get_arxiv_tool, get_duckduckgo_tool
-from .crm_tools import get_all_crm_tools
-from .sql_tools import get_sql_tool
+from importlib import import_module
+
+# Public getter -> submodule defining it
+_LAZY_IMPORTS = {
+    'get_all_search_tools': 'search_tools',
+    'get_wikipedia_tool': 'search_tools',
+    'get_arxiv_tool': 'search_tools',
+    'get_duckduckgo_tool': 'search_tools',
+    'get_all_crm_tools': 'crm_tools',
+    'get_sql_tool': 'sql_tools'
+}
+
+__all__ = list(_LAZY_IMPORTS)
+
+
+def __getattr__(name: str):
+    """
+    Import a getter from its submodule on first access (PEP 562)
+    
+    Args:
+        name: Attribute being looked up on the package
+    
+    Returns:
+        The requested getter, cached in the package namespace
+    """
+    try:
+        module_name = _LAZY_IMPORTS[name]
+    except KeyError:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}") from None
+    
+    value = getattr(import_module(f".{module_name}", __name__), name)
+    globals()[name] = value
+    return value
+
 
-__all__ = [
-    'get_all_search_tools',
-    'get_wikipedia_tool',
-    'get_arxiv_tool',
-    'get_duckduckgo_tool',
-    'get_all_crm_tools',
-    'get_sql_tool'
-]
+def __dir__():
+    """List the lazy getters alongside the loaded names"""
+    return sorted(set(globals()) | set(__all__))
@@ -14,6 +14,7 @@ from langchain.chains import create_sql_query_chain
 from langchain_openai import ChatOpenAI
 from config.settings import settings
 from config.logging_config import get_logger
+from utils.http_clients import get_http_client, get_async_http_client
 
 logger = get_logger(__name__)
 
@@ -55,7 +56,9 @@ def get_llm() -> ChatOpenAI:
             model=settings.sql_model_name,
             temperature=settings.sql_temperature,
             max_tokens=settings.sql_max_tokens,
-            openai_api_key=settings.openai_api_key
+            openai_api_key=settings.openai_api_key,
+            http_client=get_http_client(),
+            http_async_client=get_async_http_client()
         )
         logger.info(f"SQL LLM initialized: {settings.sql_model_name}")
     
@@ -2,15 +2,26 @@
 Utility Helper Functions
 Common utilities for API operations
 """
+import re
 import time
 import json
+import orjson
 from typing import Any, Dict, List, Optional
 from datetime import datetime
-from functools import wraps
+from functools import lru_cache, wraps
 from config.logging_config import get_logger
 
 logger = get_logger(__name__)
 
+# http(s) URL with a domain, localhost or IPv4 host, optional port and path
+_URL_PATTERN = re.compile(
+    r'^https?://'  # http:// or https://
+    r'(?:(?:[A-Z0-9](?:[A-Z0-9-]{0,61}[A-Z0-9])?\.)+[A-Z]{2,6}\.?|'  # domain...
+    r'localhost|'  # localhost...
+    r'\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3})'  # ...or ip
+    r'(?::\d+)?'  # optional port
+    r'(?:/?|[/?]\S+)$', re.IGNORECASE)
+
 
 def format_timestamp(dt: Optional[datetime] = None) -> str:
     """
@@ -233,31 +244,30 @@ def count_tokens_estimate(text: str) -> int:
     return len(text) // 4
 
 
+@lru_cache(maxsize=4096)
 def is_valid_url(url: str) -> bool:
     """
     Validate URL format
     
+    Results are cached, as the same URLs are checked repeatedly.
+    
     Args:
         url: URL to validate
         
     Returns:
         True if valid, False otherwise
     """
-    import re
-    url_pattern = re.compile(
-        r'^https?://'  # http:// or https://
-        r'(?:(?:[A-Z0-9](?:[A-Z0-9-]{0,61}[A-Z0-9])?\.)+[A-Z]{2,6}\.?|'  # domain...
-        r'localhost|'  # localhost...
-        r'\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3})'  # ...or ip
-        r'(?::\d+)?'  # optional port
-        r'(?:/?|[/?]\S+)$', re.IGNORECASE)
-    return url_pattern.match(url) is not None
+    return _URL_PATTERN.match(url) is not None
 
 
 def safe_json_dumps(obj: Any, **kwargs) -> str:
     """
     Safely serialize object to JSON string
     
+    Uses orjson, which encodes datetimes natively and falls back to str()
+    for other unsupported values; passing json.dumps arguments (e.g.
+    indent) selects the standard library encoder instead.
+    
     Args:
         obj: Object to serialize
         **kwargs: Additional json.dumps arguments
@@ -266,7 +276,9 @@ def safe_json_dumps(obj: Any, **kwargs) -> str:
         JSON string
     """
     try:
-        return json.dumps(obj, **kwargs)
+        if kwargs:
+            return json.dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=str, option=orjson.OPT_NON_STR_KEYS).decode()
     except (TypeError, ValueError) as e:
         logger.warning(f"JSON serialization failed: {str(e)}")
         return json.dumps({"error": "Serialization failed", "type": str(type(obj))})
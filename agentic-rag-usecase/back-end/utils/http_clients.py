@@ -0,0 +1,88 @@
+"""
+Shared HTTP Clients
+httpx connection pools for OpenAI chat and embedding calls, owned by the
+application lifespan
+"""
+import threading
+from typing import Optional
+import httpx
+from config.settings import settings
+from config.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+# Pools shared by every ChatOpenAI/OpenAIEmbeddings instance built while the
+# app is running; None outside the lifespan
+_http_client: Optional[httpx.Client] = None
+_async_http_client: Optional[httpx.AsyncClient] = None
+_clients_lock = threading.Lock()
+
+
+def _limits() -> httpx.Limits:
+    """Connection pool limits from settings"""
+    return httpx.Limits(
+        max_connections=settings.http_max_connections,
+        max_keepalive_connections=settings.http_max_keepalive_connections
+    )
+
+
+def open_http_clients() -> None:
+    """
+    Create the shared HTTP clients (idempotent)
+    
+    Called from the lifespan startup, on the server's event loop, before any
+    service is initialized; the async client's connections belong to that loop.
+    """
+    global _http_client, _async_http_client
+    
+    with _clients_lock:
+        if _http_client is not None:
+            return
+        _http_client = httpx.Client(limits=_limits(), timeout=settings.http_timeout)
+        _async_http_client = httpx.AsyncClient(limits=_limits(), timeout=settings.http_timeout)
+    
+    logger.info(
+        f"HTTP client pools created (max {settings.http_max_connections} connections)"
+    )
+
+
+async def close_http_clients() -> None:
+    """
+    Close the shared HTTP clients at lifespan shutdown
+    
+    Services built during the lifespan keep references to the closed
+    clients, so they must be rebuilt if the app is started again in-process.
+    """
+    global _http_client, _async_http_client
+    
+    with _clients_lock:
+        http_client, async_http_client = _http_client, _async_http_client
+        _http_client = _async_http_client = None
+    
+    if http_client is not None:
+        http_client.close()
+    if async_http_client is not None:
+        await async_http_client.aclose()
+        logger.info("HTTP client pools closed")
+
+
+def get_http_client() -> Optional[httpx.Client]:
+    """
+    Get the shared synchronous HTTP client
+    
+    Returns:
+        httpx.Client with the configured pool limits and timeout, or None
+        outside the app lifespan (the OpenAI SDK then uses its own client)
+    """
+    return _http_client
+
+
+def get_async_http_client() -> Optional[httpx.AsyncClient]:
+    """
+    Get the shared asynchronous HTTP client
+    
+    Returns:
+        httpx.AsyncClient bound to the lifespan's event loop, or None outside
+        the app lifespan (the OpenAI SDK then uses its own client)
+    """
+    return _async_http_client
@@ -0,0 +1,115 @@
+"""
+Text Splitter
+Regex-based chunking of loaded documents for the FAISS index
+"""
+import multiprocessing
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import List
+from langchain_core.documents import Document
+
+# Chunk boundaries fall just after a separator, preferring earlier ones
+_SEPARATORS = ("\n\n", "\n", ". ", ", ", " ")
+_SEPARATOR_PATTERN = re.compile("|".join(map(re.escape, _SEPARATORS)))
+
+# Below this much text, worker process start-up costs more than it saves
+_PARALLEL_MIN_CHARS = 5_000_000
+
+
+def _chunk_end(text: str, start: int, limit: int) -> int:
+    """
+    Pick where a chunk starting at start should end, at most at limit
+    
+    Args:
+        text: Text being split
+        start: Chunk start offset
+        limit: Furthest allowed end offset
+    
+    Returns:
+        Offset just after the preferred separator, or limit if none fits
+    """
+    # Highest-priority separator that still fills at least half the chunk,
+    # otherwise any separator at all
+    for low in (start + (limit - start) // 2, start):
+        for separator in _SEPARATORS:
+            index = text.rfind(separator, low, limit)
+            if index != -1:
+                return index + len(separator)
+    return limit
+
+
+def split_text(text: str, chunk_size: int, chunk_overlap: int) -> List[str]:
+    """
+    Split text into chunks of at most chunk_size characters
+    
+    Each chunk ends on the highest-priority separator (paragraph, line,
+    sentence, clause, word) that keeps it at least half full; a run with
+    no separator is cut at chunk_size. Consecutive chunks share up to
+    chunk_overlap characters, starting just after a separator.
+    
+    Args:
+        text: Text to split
+        chunk_size: Maximum chunk length
+        chunk_overlap: Maximum overlap between consecutive chunks
+    
+    Returns:
+        Whitespace-stripped, non-empty chunks in text order
+    """
+    length = len(text)
+    chunks = []
+    start = 0
+    while start < length:
+        limit = start + chunk_size
+        end = length if limit >= length else _chunk_end(text, start, limit)
+        
+        chunk = text[start:end].strip()
+        if chunk:
+            chunks.append(chunk)
+        if end >= length:
+            break
+        
+        # Next chunk starts after the first separator in the overlap window
+        window = max(end - chunk_overlap - 1, start)
+        match = _SEPARATOR_PATTERN.search(text, window, end)
+        start = match.end() if match else end
+    
+    return chunks
+
+
+def split_documents(documents: List[Document], chunk_size: int,
+                    chunk_overlap: int) -> List[Document]:
+    """
+    Split documents into chunk documents, keeping each source's metadata
+    
+    Large corpora are split across worker processes, one document per task.
+    Workers are spawned rather than forked: this runs in a worker thread at
+    startup, and a fork would copy locks held by other threads (logging,
+    HTTP pools) in their locked state.
+    
+    Args:
+        documents: Loaded documents
+        chunk_size: Maximum chunk length
+        chunk_overlap: Maximum overlap between consecutive chunks
+    
+    Returns:
+        Chunk documents in source order
+    """
+    split = partial(split_text, chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    texts = [doc.page_content for doc in documents]
+    workers = min(len(texts), os.cpu_count() or 1)
+    
+    if workers > 1 and sum(map(len, texts)) >= _PARALLEL_MIN_CHARS:
+        with ProcessPoolExecutor(
+            max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+        ) as executor:
+            chunk_lists = list(executor.map(split, texts))
+    else:
+        chunk_lists = list(map(split, texts))
+    
+    return [
+        Document(page_content=chunk, metadata=dict(doc.metadata))
+        for doc, chunks in zip(documents, chunk_lists)
+        for chunk in chunks
+    ]